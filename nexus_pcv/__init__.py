@@ -1,5 +1,23 @@
 # Copyright: (c) 2022, Daniel Schmidt <danischm@cisco.com>
 
-from importlib.metadata import version  # type: ignore
+from typing import TYPE_CHECKING, Any
 
-__version__ = version(__name__)
+if TYPE_CHECKING:
+    from .api import Validator
+    from .pcv import PCVResult
+
+__all__ = ["PCVResult", "Validator"]
+
+
+def __getattr__(name: str) -> Any:
+    # resolve lazily as importing importlib.metadata and the validation
+    # dependencies slows down CLI startup
+    if name == "__version__":
+        from importlib.metadata import version  # type: ignore
+
+        return version(__name__)
+    if name in __all__:
+        from . import api
+
+        return getattr(api, name)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -3,4 +3,4 @@
 import nexus_pcv.cli.main
 
 if __name__ == "__main__":
-    nexus_pcv.cli.main.main()
+    nexus_pcv.cli.main.run()
@@ -0,0 +1,154 @@
+# Copyright: (c) 2022, Daniel Schmidt <danischm@cisco.com>
+
+import contextlib
+import logging
+import os
+import socket
+import sqlite3
+import threading
+import time
+from collections.abc import Iterator
+
+logger = logging.getLogger(__name__)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS tickets (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    key TEXT NOT NULL,
+    owner TEXT NOT NULL,
+    heartbeat REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS tickets_key ON tickets (key, id);
+"""
+
+
+class AdmissionController:
+    """Limit concurrent pre-change validations across processes sharing a SQLite database
+
+    Each process queues a ticket per key (e.g. NDI host, insights group and
+    site). Slots are granted in FIFO order to the oldest tickets. Tickets of
+    crashed processes expire once their heartbeat is older than `lease`
+    seconds.
+    """
+
+    def __init__(
+        self,
+        filename: str,
+        max_concurrent: int = 1,
+        timeout: float = 0,
+        poll_interval: float = 2.0,
+        lease: float = 60.0,
+    ):
+        self.filename = filename
+        self.max_concurrent = max_concurrent
+        self.timeout = timeout
+        self.poll_interval = poll_interval
+        self.lease = lease
+        self.owner = f"{socket.gethostname()}:{os.getpid()}"
+        try:
+            with contextlib.closing(self._connect()) as connection:
+                connection.executescript(SCHEMA)
+        except sqlite3.Error as e:
+            logger.error(f"Failed to open admission database: {filename}")
+            raise RuntimeError(
+                f"Failed to open admission database '{filename}': {e}"
+            ) from e
+
+    def _connect(self) -> sqlite3.Connection:
+        """Helper function to open a database connection in autocommit mode"""
+        return sqlite3.connect(self.filename, timeout=30, isolation_level=None)
+
+    @contextlib.contextmanager
+    def _transaction(self) -> Iterator[sqlite3.Connection]:
+        """Helper function to run statements in an exclusive write transaction"""
+        with contextlib.closing(self._connect()) as connection:
+            connection.execute("BEGIN IMMEDIATE")
+            try:
+                yield connection
+            except BaseException:
+                connection.execute("ROLLBACK")
+                raise
+            connection.execute("COMMIT")
+
+    def _enqueue(self, key: str) -> int:
+        """Helper function to queue a new ticket"""
+        with self._transaction() as connection:
+            cursor = connection.execute(
+                "INSERT INTO tickets (key, owner, heartbeat) VALUES (?, ?, ?)",
+                (key, self.owner, time.time()),
+            )
+            return int(cursor.lastrowid or 0)
+
+    def _granted(self, key: str, ticket: int) -> bool | None:
+        """Helper function to refresh ticket and return whether a slot is granted, None if the ticket expired"""
+        now = time.time()
+        with self._transaction() as connection:
+            connection.execute(
+                "DELETE FROM tickets WHERE heartbeat < ?", (now - self.lease,)
+            )
+            cursor = connection.execute(
+                "UPDATE tickets SET heartbeat = ? WHERE id = ?", (now, ticket)
+            )
+            if not cursor.rowcount:
+                return None
+            (ahead,) = connection.execute(
+                "SELECT COUNT(*) FROM tickets WHERE key = ? AND id < ?", (key, ticket)
+            ).fetchone()
+        return bool(ahead < self.max_concurrent)
+
+    def acquire(self, key: str) -> tuple[int, float]:
+        """Wait for a slot and return ticket and time waited in seconds"""
+        start = time.monotonic()
+        ticket = self._enqueue(key)
+        logged = False
+        while True:
+            granted = self._granted(key, ticket)
+            if granted is None:
+                logger.warning("Admission ticket expired, queueing again")
+                ticket = self._enqueue(key)
+                continue
+            waited = time.monotonic() - start
+            if granted:
+                return ticket, waited
+            if self.timeout and waited > self.timeout:
+                self.release(ticket)
+                raise RuntimeError(
+                    f"Timeout waiting for a free pre-change validation slot for '{key}'"
+                )
+            if not logged:
+                logger.info(f"Waiting for a free pre-change validation slot ({key})")
+                logged = True
+            time.sleep(self.poll_interval)
+
+    def release(self, ticket: int) -> None:
+        """Release slot or leave queue"""
+        with self._transaction() as connection:
+            connection.execute("DELETE FROM tickets WHERE id = ?", (ticket,))
+
+    def _heartbeat(self, ticket: int, stop: threading.Event) -> None:
+        """Helper function to refresh ticket of granted slot until stopped"""
+        while not stop.wait(self.lease / 3):
+            try:
+                with self._transaction() as connection:
+                    connection.execute(
+                        "UPDATE tickets SET heartbeat = ? WHERE id = ?",
+                        (time.time(), ticket),
+                    )
+            except sqlite3.Error as e:
+                logger.warning(f"Failed to refresh admission ticket: {e}")
+
+    @contextlib.contextmanager
+    def slot(self, key: str) -> Iterator[float]:
+        """Hold a slot while the context is active, yielding the time waited in seconds"""
+        ticket, waited = self.acquire(key)
+        stop = threading.Event()
+        thread = threading.Thread(
+            target=self._heartbeat, args=(ticket, stop), daemon=True
+        )
+        thread.start()
+        try:
+            yield waited
+        finally:
+            stop.set()
+            thread.join()
+            self.release(ticket)
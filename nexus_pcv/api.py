@@ -0,0 +1,108 @@
+# Copyright: (c) 2022, Daniel Schmidt <danischm@cisco.com>
+
+import logging
+import threading
+import time
+from collections.abc import Iterable
+from typing import Any
+
+from .admission import AdmissionController
+from .ndi import NDI
+from .pcv import PCV, Changes, PCVResult
+from .resolver import ResolverStore
+from .retry import RetryPolicy
+from .rules import RuleSet
+from .writers import EventWriter
+
+logger = logging.getLogger(__name__)
+
+
+class Validator:
+    """In-process API running pre-change validations with a shared NDI session
+
+    A single validator can run any number of validations, also concurrently
+    from multiple threads. Each validation loads its changes into a fresh
+    object tree, while the NDI session and epoch cache are reused.
+    """
+
+    def __init__(
+        self,
+        hostname_ip: str,
+        username: str,
+        password: str,
+        domain: str = "local",
+        timeout: int = 15,
+        epoch_cache_ttl: int = 0,
+        retry: RetryPolicy | None = None,
+        ndi: NDI | None = None,
+        resolver: ResolverStore | None = None,
+        admission: AdmissionController | None = None,
+    ):
+        self.ndi = (
+            ndi
+            if ndi is not None
+            else NDI(
+                hostname_ip,
+                username,
+                password,
+                domain,
+                timeout,
+                epoch_cache_ttl=epoch_cache_ttl,
+                retry=retry,
+            )
+        )
+        self.resolver = resolver
+        self.admission = admission
+
+    def validate(
+        self,
+        name: str,
+        site: str,
+        changes: Changes | None = None,
+        tf_changes: Iterable[dict[str, Any]] | None = None,
+        group: str = "default",
+        rules: str | RuleSet = "",
+        incremental_state: str = "",
+        details: bool = False,
+        writers: Iterable[EventWriter] = (),
+        cancel: threading.Event | None = None,
+        deadline: float | None = None,
+    ) -> PCVResult:
+        """Validate proposed changes and return result
+
+        Changes can be given as JSON document (APIC object or `imdata` list),
+        list of JSON documents, stream of a JSON document or object tree and as
+        Terraform plan resource changes (`resource_changes` of a plan). Errors
+        loading the changes raise an exception, failed NDI requests are
+        reported in the result. See `PCV.validate()` for cancellation and
+        deadline.
+        """
+        pcv = PCV(
+            self.ndi.hostname_ip,
+            self.ndi.username,
+            self.ndi.password,
+            self.ndi.domain,
+            self.ndi.timeout,
+            ndi=self.ndi,
+            resolver=self.resolver,
+            admission=self.admission,
+        )
+        start = time.monotonic()
+        if changes is not None:
+            pcv.load(changes)
+        if tf_changes is not None:
+            pcv.load_tf_changes(tf_changes)
+        loaded = time.monotonic() - start
+        result = pcv.validate(
+            name,
+            group,
+            site,
+            rules,
+            incremental_state,
+            details,
+            writers,
+            cancel,
+            deadline,
+        )
+        result.timings["load"] = loaded
+        return result
@@ -1,12 +1,108 @@
 # Copyright: (c) 2022, Daniel Schmidt <danischm@cisco.com>
 
-import json
+import fnmatch
+import hashlib
 import logging
+from collections.abc import Iterator
 from typing import Optional, Union
 
+from . import codec
+from .dn import parse_dn
+
 logger = logging.getLogger(__name__)
 
 
+class _TrieNode:
+    """Node of DN trie holding objects with the DN of the node"""
+
+    def __init__(self) -> None:
+        self.children: dict[str, _TrieNode] = {}
+        self.objects: dict[ApicObject, None] = {}
+
+    def iter_objects(self) -> Iterator["ApicObject"]:
+        """Yield objects of node and all descendant nodes"""
+        yield from tuple(self.objects)
+        for child in tuple(self.children.values()):
+            yield from child.iter_objects()
+
+    def match(self, rns: tuple[str, ...]) -> Iterator["_TrieNode"]:
+        """Yield nodes matching RN patterns with wildcards (`*`, `?` and `**`)"""
+        if not rns:
+            yield self
+            return
+        rn, rest = rns[0], rns[1:]
+        if rn == "**":
+            yield from self.match(rest)
+            for child in tuple(self.children.values()):
+                yield from child.match(rns)
+        elif "*" in rn or "?" in rn:
+            # brackets are part of RNs and not character classes
+            pattern = rn.replace("[", "[[]")
+            for name, child in tuple(self.children.items()):
+                if fnmatch.fnmatchcase(name, pattern):
+                    yield from child.match(rest)
+        elif rn in self.children:
+            yield from self.children[rn].match(rest)
+
+
+class _ApicIndex:
+    """Classname index and DN trie of a tree, maintained by the tree operations
+
+    Classnames of objects are only expected to change from unknown (None) to
+    a resolved classname, such objects are moved on the next class query.
+    """
+
+    def __init__(self, root: "ApicObject"):
+        self.classes: dict[str | None, dict[ApicObject, None]] = {}
+        self.trie = _TrieNode()
+        self.add(root)
+
+    def add(self, obj: "ApicObject", subtree: bool = True) -> None:
+        """Add object and optionally its subtree to index"""
+        stack = [obj]
+        while stack:
+            o = stack.pop()
+            self.classes.setdefault(o.cl, {})[o] = None
+            dn = o.attributes.get("dn")
+            if dn:
+                node = self.trie
+                for rn in parse_dn(dn):
+                    child = node.children.get(rn)
+                    if child is None:
+                        child = node.children[rn] = _TrieNode()
+                    node = child
+                node.objects[o] = None
+            if subtree:
+                stack.extend(reversed(o.children))
+
+    def by_class(self, cl: str) -> Iterator["ApicObject"]:
+        """Yield objects with classname"""
+        unresolved = self.classes.get(None)
+        if unresolved:
+            for o in [o for o in unresolved if o.cl is not None]:
+                del unresolved[o]
+                self.classes.setdefault(o.cl, {})[o] = None
+        return (o for o in tuple(self.classes.get(cl, ())) if o.cl == cl)
+
+    def by_dn(self, dn: str) -> tuple["ApicObject", ...]:
+        """Return objects with DN"""
+        node = self.trie
+        for rn in parse_dn(dn):
+            child = node.children.get(rn)
+            if child is None:
+                return ()
+            node = child
+        return tuple(node.objects)
+
+    def by_dn_pattern(self, pattern: str, prefix: bool) -> Iterator["ApicObject"]:
+        """Yield objects with DN matching pattern, or below if prefix is set"""
+        for node in self.trie.match(parse_dn(pattern)):
+            if prefix:
+                yield from node.iter_objects()
+            else:
+                yield from tuple(node.objects)
+
+
 class ApicObject:
     def __init__(
         self,
@@ -19,6 +115,10 @@ class ApicObject:
         self.attributes = attributes
         self.children = children
         self.parent = parent
+        # index of tree, only held by the topmost object
+        self._index: _ApicIndex | None = None
+        # cached hash of subtree, only set if set for all children
+        self._digest: bytes | None = None
 
     def update(
         self,
@@ -27,6 +127,7 @@ class ApicObject:
     ) -> None:
         """Update object attributes, classname and children"""
         self.attributes.update(attributes)
+        self.invalidate()
         for child in children:
             dn = child.attributes.get("dn")
             name = child.attributes.get("name")
@@ -50,41 +151,161 @@ class ApicObject:
             if found:
                 continue
             # add as a new child
-            self.children.append(
-                ApicObject(child.cl, child.attributes, child.children, self)
-            )
+            new_child = ApicObject(child.cl, child.attributes, child.children, self)
+            new_child._digest = child._digest
+            new_child._adopt()
+            self.children.append(new_child)
+            self._indexed(new_child)
+
+    def _adopt(self) -> None:
+        """Helper function to set parent of all objects in subtree, e.g. of trees built by hand"""
+        for child in self.children:
+            child.parent = self
+            child._adopt()
+
+    def _key(self) -> tuple[str | None, ...]:
+        """Helper function to return key identifying object among its siblings"""
+        dn = self.attributes.get("dn")
+        if dn is not None:
+            return (self.cl, "dn", dn)
+        name = self.attributes.get("name")
+        if name is not None:
+            return (self.cl, "name", name)
+        return (
+            self.cl,
+            "attributes",
+            *sorted(f"{k}={v}" for k, v in self.attributes.items()),
+        )
+
+    def copy(self, parent: Optional["ApicObject"] = None) -> "ApicObject":
+        """Return deep copy of subtree"""
+        obj = ApicObject(self.cl, dict(self.attributes), [], parent)
+        obj.children = [c.copy(obj) for c in self.children]
+        obj._digest = self._digest
+        return obj
+
+    def diff(self, base: Optional["ApicObject"]) -> Optional["ApicObject"]:
+        """Return copy of subtree with only objects new or modified compared to base"""
+        if base is None or base.cl != self.cl:
+            return self.copy()
+        if self.digest() == base.digest():
+            return None
+        base_children = {c._key(): c for c in base.children}
+        children = []
+        for child in self.children:
+            delta = child.diff(base_children.get(child._key()))
+            if delta is not None:
+                children.append(delta)
+        if not children and self.attributes == base.attributes:
+            return None
+        obj = ApicObject(self.cl, dict(self.attributes), children, None)
+        for child in children:
+            child.parent = obj
+        return obj
+
+    def digest(self) -> bytes:
+        """Return hash of subtree over classname, attributes and children (in any order)
+
+        The hash is cached and invalidated by tree operations. Call
+        `invalidate()` after modifying classname or attributes directly.
+        """
+        if self._digest is None:
+            data = codec.dumps([self.cl, sorted(self.attributes.items())])
+            h = hashlib.blake2b(data.encode(), digest_size=16)
+            for digest in sorted(c.digest() for c in self.children):
+                h.update(digest)
+            self._digest = h.digest()
+        return self._digest
+
+    def invalidate(self) -> None:
+        """Invalidate cached hash of object and its ancestors"""
+        obj: ApicObject | None = self
+        while obj is not None and obj._digest is not None:
+            obj._digest = None
+            obj = obj.parent
+
+    def _top(self) -> Optional["ApicObject"]:
+        """Helper function to return topmost object of tree"""
+        obj = self
+        # max search depth 100
+        for _i in range(100):
+            if obj.parent is None:
+                return obj
+            obj = obj.parent
+        return None
+
+    def _get_index(self) -> _ApicIndex | None:
+        """Helper function to return index of tree, building it if needed"""
+        top = self._top()
+        if top is None:
+            return None
+        if top._index is None:
+            top._index = _ApicIndex(top)
+        return top._index
+
+    def _indexed(self, obj: "ApicObject") -> None:
+        """Helper function to add object attached to tree to the index, if any"""
+        top = self._top()
+        obj._index = None
+        if top is not None and top._index is not None:
+            top._index.add(obj)
+
+    def _contains(self, obj: "ApicObject") -> bool:
+        """Helper function to return whether object is part of subtree"""
+        o: ApicObject | None = obj
+        while o is not None:
+            if o is self:
+                return True
+            o = o.parent
+        return False
+
+    def _scan(self) -> Iterator["ApicObject"]:
+        """Helper function to yield all objects of subtree"""
+        yield self
+        for child in self.children:
+            yield from child._scan()
+
+    def query(
+        self, cl: str = "", dn: str = "", prefix: bool = False
+    ) -> Iterator["ApicObject"]:
+        """Return iterator over objects in subtree by classname and/or DN
+
+        DNs may contain `*` and `?` wildcards matching within a RN and `**`
+        matching any number of RNs. If prefix is set, objects below a matching
+        DN are included as well.
+        """
+        index = self._get_index()
+        top = index is None or self.parent is None
+        if index is None:
+            # tree without topmost object (cyclic parents), use temporary index
+            index = _ApicIndex(self)
+        objs: Iterator[ApicObject]
+        if dn:
+            objs = index.by_dn_pattern(dn, prefix)
+        elif cl:
+            objs = index.by_class(cl)
+        else:
+            objs = self._scan()
+        return (
+            o for o in objs if (not cl or o.cl == cl) and (top or self._contains(o))
+        )
 
     def find(self, dn: str = "", cl: str = "") -> list["ApicObject"]:
         """Find objects by dn or classname in subtree"""
-        result: list[ApicObject] = []
         if not dn and not cl:
-            return result
-        elif not cl:
-            if self.attributes.get("dn") == dn:
-                result.append(self)
-        elif not dn:
-            if self.cl == cl:
-                result.append(self)
-        elif self.attributes.get("dn") == dn and self.cl == cl:
-            result.append(self)
-        for child in self.children:
-            objs = child.find(dn=dn, cl=cl)
-            result.extend(objs)
-        return result
-
-    def _index_of_last_dn_delimiter(self, dn: str) -> int:
-        """Helper function to return index of last delimiter ('/') in DN string"""
-        escaped = 0
-        index = len(dn) - 1
-        for c in reversed(dn):
-            if c == "]":
-                escaped += 1
-            elif c == "[":
-                escaped -= 1
-            elif c == "/" and escaped == 0:
-                return index
-            index -= 1
-        return -1
+            return []
+        index = self._get_index()
+        if index is None:
+            return [
+                o
+                for o in self._scan()
+                if (not dn or o.attributes.get("dn") == dn) and (not cl or o.cl == cl)
+            ]
+        objs = index.by_dn(dn) if dn else index.by_class(cl)
+        top = self.parent is None
+        return [
+            o for o in objs if (not cl or o.cl == cl) and (top or self._contains(o))
+        ]
 
     def insert(self, obj: Optional["ApicObject"]) -> None:
         """Insert object in correct place in tree according to dn"""
@@ -95,16 +316,22 @@ class ApicObject:
         if len(o) > 0:
             o[0].update(obj.attributes, obj.children)
         else:
-            index = self._index_of_last_dn_delimiter(dn)
-            if index == -1:
+            rns = parse_dn(dn)
+            if len(rns) == 1:
                 self.children.append(obj)
                 obj.parent = self
+                obj._adopt()
+                self.invalidate()
+                self._indexed(obj)
             else:
-                parent_dn = dn[:index]
+                parent_dn = "/".join(rns[:-1])
                 o = self.find(dn=parent_dn)
                 if len(o) > 0:
                     o[0].children.append(obj)
                     obj.parent = o[0]
+                    obj._adopt()
+                    o[0].invalidate()
+                    self._indexed(obj)
                 else:
                     new_obj = ApicObject(None, {"dn": parent_dn}, [obj], None)
                     obj.parent = new_obj
@@ -115,7 +342,10 @@ class ApicObject:
     ) -> "ApicObject":
         """Add child to object"""
         child = ApicObject(cl, attributes, children, self)
+        child._adopt()
         self.children.append(child)
+        self.invalidate()
+        self._indexed(child)
         return child
 
     def add_parent(self, cl: str, attributes: dict[str, str]) -> "ApicObject":
@@ -123,6 +353,10 @@ class ApicObject:
         if self.parent is not None:
             raise Exception(f"ApicObject {str(ApicObject)} already has a parent.")
         self.parent = ApicObject(cl, attributes, [self], None)
+        if self._index is not None:
+            # index moves to the new topmost object
+            self.parent._index, self._index = self._index, None
+            self.parent._index.add(self.parent, subtree=False)
         return self.parent
 
     def get_root(self) -> Optional["ApicObject"]:
@@ -145,10 +379,20 @@ class ApicObject:
         else:
             return self.children[key]
 
-    def __str__(self) -> str:
-        """Return json string."""
+    def _serialize(self, parts: list[str]) -> None:
+        """Helper function to append JSON string fragments of subtree to parts"""
         attr_string = ", ".join(
-            [f'"{k}": {json.dumps(v)}' for k, v in self.attributes.items()]
+            [f'"{k}": {codec.dumps(v)}' for k, v in self.attributes.items()]
         )
-        child_string = ", ".join([str(c) for c in self.children])
-        return f'{{"{self.cl}": {{"attributes": {{{attr_string}}}, "children": [{child_string}]}}}}'
+        parts.append(f'{{"{self.cl}": {{"attributes": {{{attr_string}}}, "children": [')
+        for index, child in enumerate(self.children):
+            if index:
+                parts.append(", ")
+            child._serialize(parts)
+        parts.append("]}}")
+
+    def __str__(self) -> str:
+        """Return json string."""
+        parts: list[str] = []
+        self._serialize(parts)
+        return "".join(parts)
@@ -0,0 +1,194 @@
+# Copyright: (c) 2022, Daniel Schmidt <danischm@cisco.com>
+
+import gc
+import hashlib
+import logging
+import mmap
+import os
+import struct
+import sys
+import tempfile
+from array import array
+from collections.abc import Sequence
+from pathlib import Path
+
+from .apic import ApicObject
+
+logger = logging.getLogger(__name__)
+
+# Cache file layout (little endian):
+#   header: magic, number of strings, length of string table, number of integers
+#   string table: UTF-8 strings separated by NUL characters
+#   padding to a 4 byte boundary
+#   integers (uint32): number of objects, followed by each object in pre-order
+#     as classname index + 1 (0 if unknown), number of attributes, number of
+#     children and key/value string indices of all attributes
+MAGIC = b"NPCVOBJ1"
+HEADER = struct.Struct("<8sIII")
+
+DEFAULT_MAX_SIZE = 1024 * 1024 * 1024
+
+
+class _UnsupportedObject(Exception):
+    pass
+
+
+def _encode(objects: Sequence[ApicObject]) -> bytes:
+    """Helper function to encode object trees to the binary cache format"""
+    strings: dict[str, int] = {}
+    ints = array("I", [len(objects)])
+
+    def index(value: str) -> int:
+        if type(value) is not str or "\0" in value:
+            raise _UnsupportedObject(f"Unsupported attribute value: {value!r}")
+        i = strings.get(value)
+        if i is None:
+            i = strings[value] = len(strings)
+        return i
+
+    def encode(obj: ApicObject) -> None:
+        ints.append(0 if obj.cl is None else index(obj.cl) + 1)
+        ints.append(len(obj.attributes))
+        ints.append(len(obj.children))
+        for k, v in obj.attributes.items():
+            ints.append(index(k))
+            ints.append(index(v))
+        for child in obj.children:
+            encode(child)
+
+    for obj in objects:
+        encode(obj)
+    if sys.byteorder != "little":
+        ints.byteswap()
+    table = "\0".join(strings).encode()
+    padding = b"\0" * (-(HEADER.size + len(table)) % 4)
+    header = HEADER.pack(MAGIC, len(strings), len(table), len(ints))
+    return header + table + padding + ints.tobytes()
+
+
+def _decode(buffer: memoryview) -> list[ApicObject]:
+    """Helper function to decode object trees from the binary cache format"""
+    magic, n_strings, table_size, n_ints = HEADER.unpack_from(buffer)
+    if magic != MAGIC:
+        raise ValueError("Invalid cache file")
+    offset = HEADER.size
+    strings = str(buffer[offset : offset + table_size], "utf-8").split("\0")
+    if len(strings) != max(n_strings, 1):
+        raise ValueError("Invalid string table")
+    offset += table_size + (-(offset + table_size) % 4)
+    if len(buffer) - offset != n_ints * 4:
+        raise ValueError("Truncated cache file")
+    if sys.byteorder == "little":
+        with buffer[offset:].cast("I") as view:
+            ints = view.tolist()
+    else:
+        data = array("I", buffer[offset:])
+        data.byteswap()
+        ints = data.tolist()
+    next_int = iter(ints).__next__
+
+    def decode(parent: ApicObject | None) -> ApicObject:
+        cl = next_int()
+        n_attrs = next_int()
+        n_children = next_int()
+        attributes = {strings[next_int()]: strings[next_int()] for _ in range(n_attrs)}
+        obj = ApicObject(strings[cl - 1] if cl else None, attributes, [], parent)
+        if n_children:
+            obj.children = [decode(obj) for _ in range(n_children)]
+        return obj
+
+    # avoid repeated garbage collection runs triggered by allocating many objects
+    gc_enabled = gc.isenabled()
+    gc.disable()
+    try:
+        return [decode(None) for _ in range(next_int())]
+    finally:
+        if gc_enabled:
+            gc.enable()
+
+
+class InventoryCache:
+    """Cache of loaded and resolved objects of input files keyed by file content
+
+    Cache files are evicted in least recently used order once the total size
+    exceeds `max_size` bytes.
+    """
+
+    def __init__(self, directory: str, max_size: int = DEFAULT_MAX_SIZE):
+        from . import __version__
+
+        self.directory = Path(directory)
+        self.max_size = max_size
+        self.version = __version__
+
+    def _path(self, data: bytes) -> Path:
+        """Helper function to return cache file path of file content"""
+        digest = hashlib.sha256(MAGIC + self.version.encode() + b"\0" + data)
+        return self.directory / f"{digest.hexdigest()}.bin"
+
+    def load(self, data: bytes) -> list[ApicObject] | None:
+        """Load cached objects of file content"""
+        path = self._path(data)
+        try:
+            with open(path, "rb") as file:
+                try:
+                    mm = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+                except (OSError, ValueError):
+                    # e.g. empty files or file systems not supporting mmap
+                    objects = _decode(memoryview(file.read()))
+                else:
+                    with mm, memoryview(mm) as buffer:
+                        objects = _decode(buffer)
+            # update modification time for LRU eviction
+            os.utime(path)
+        except FileNotFoundError:
+            return None
+        except Exception as e:
+            logger.warning(f"Ignoring invalid cache file '{path}': {e}")
+            return None
+        logger.debug(f"Loaded objects from cache file '{path}'")
+        return objects
+
+    def save(self, data: bytes, objects: Sequence[ApicObject]) -> None:
+        """Save objects of file content to cache"""
+        try:
+            encoded = _encode(objects)
+        except _UnsupportedObject as e:
+            logger.debug(f"Objects not cached: {e}")
+            return
+        path = self._path(data)
+        try:
+            self.directory.mkdir(parents=True, exist_ok=True)
+            # unique temporary file as the same file might be cached concurrently
+            with tempfile.NamedTemporaryFile(
+                dir=self.directory, prefix=f"{path.stem}.", suffix=".tmp", delete=False
+            ) as file:
+                try:
+                    file.write(encoded)
+                    file.close()
+                    os.replace(file.name, path)
+                except BaseException:
+                    Path(file.name).unlink(missing_ok=True)
+                    raise
+            logger.debug(f"Saved objects to cache file '{path}'")
+            self._evict()
+        except OSError as e:
+            # caching is an optimization only
+            logger.warning(f"Objects not cached in '{self.directory}': {e}")
+
+    def _evict(self) -> None:
+        """Helper function to remove least recently used cache files exceeding the size limit"""
+        entries = []
+        for path in self.directory.glob("*.bin"):
+            try:
+                stat = path.stat()
+            except FileNotFoundError:
+                continue
+            entries.append((stat.st_mtime, stat.st_size, path))
+        total = sum(e[1] for e in entries)
+        for _, size, path in sorted(entries, key=lambda e: e[0]):
+            if total <= self.max_size:
+                break
+            logger.debug(f"Evicting cache file '{path}'")
+            path.unlink(missing_ok=True)
+            total -= size
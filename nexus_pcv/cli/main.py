@@ -1,13 +1,15 @@
 # Copyright: (c) 2022, Daniel Schmidt <danischm@cisco.com>
 
 import logging
+import signal
 import sys
+import threading
 from pathlib import Path
+from typing import Any
 
 import typer
 
 import nexus_pcv
-from nexus_pcv.pcv import PCV
 
 from . import options
 
@@ -37,6 +39,11 @@ def configure_logging(level: str) -> None:
     logger.setLevel(lev)
 
 
+def terminate(signum: int, frame: Any) -> None:
+    """Exit on SIGTERM (e.g., cancelled CI job), deleting a running pre-change analysis"""
+    raise SystemExit(128 + signum)
+
+
 def version_callback(value: bool) -> None:
     if value:
         typer.echo(f"nexus-pcv version {nexus_pcv.__version__}")
@@ -53,11 +60,24 @@ def main(
     domain: str = options.domain,
     group: str = options.group,
     timeout: int = options.timeout,
+    max_retries: int = options.max_retries,
     suppress_events: str = options.suppress_events,
+    rules: Path | None = options.rules,
     file: list[Path] | None = options.file,
-    nac_tf_plan: Path | None = options.nac_tf_plan,
-    output_summary: Path | None = options.output_summary,
+    nac_tf_plan: list[Path] | None = options.nac_tf_plan,
+    output_summary: list[Path] | None = options.output_summary,
     output_url: Path | None = options.output_url,
+    details: bool = options.details,
+    incremental_state: Path | None = options.incremental_state,
+    prefetch: bool = options.prefetch,
+    watch: bool = options.watch,
+    cache_dir: Path | None = options.cache_dir,
+    cache_max_size: int = options.cache_max_size,
+    resolver_db: Path | None = options.resolver_db,
+    fabric_snapshot: list[Path] | None = options.fabric_snapshot,
+    admission_db: Path | None = options.admission_db,
+    max_concurrent: int = options.max_concurrent,
+    admission_timeout: int = options.admission_timeout,
     verbosity: str = options.verbosity,
     version: bool = typer.Option(
         False,
@@ -69,26 +89,111 @@ def main(
 ) -> None:
     """A CLI tool to perform a pre-change validation on Nexus Dashboard Insights."""
     configure_logging(verbosity)
+    signal.signal(signal.SIGTERM, terminate)
+
+    # imported lazily to keep startup fast for --help and --version
+    from nexus_pcv.admission import AdmissionController
+    from nexus_pcv.cache import InventoryCache
+    from nexus_pcv.ndi import NDI
+    from nexus_pcv.pcv import PCV
+    from nexus_pcv.resolver import ResolverStore
+    from nexus_pcv.retry import RetryPolicy
+    from nexus_pcv.rules import RuleSet
+    from nexus_pcv.watch import Watcher
 
     try:
-        pcv = PCV(hostname_ip, username, password, domain, timeout)
+        rule_set = RuleSet.from_suppress_events(suppress_events)
+        if rules:
+            rule_set.load(str(rules))
+
+        resolver = ResolverStore(str(resolver_db)) if resolver_db else None
+        admission = (
+            AdmissionController(
+                str(admission_db), max_concurrent, admission_timeout * 60
+            )
+            if admission_db
+            else None
+        )
+        ndi = NDI(
+            hostname_ip,
+            username,
+            password,
+            domain,
+            timeout,
+            retry=RetryPolicy(max_attempts=max_retries + 1),
+        )
+        pcv = PCV(
+            hostname_ip,
+            username,
+            password,
+            domain,
+            timeout,
+            ndi=ndi,
+            resolver=resolver,
+            admission=admission,
+        )
+        if prefetch:
+            pcv.prefetch_epoch(group, site)
+
+        cache = (
+            InventoryCache(str(cache_dir), cache_max_size * 1024 * 1024)
+            if cache_dir
+            else None
+        )
+        if fabric_snapshot:
+            pcv.load_fabric_snapshot([str(f) for f in fabric_snapshot])
+
+        def validate(cancel: threading.Event | None = None) -> tuple[Any, ...]:
+            return pcv.ndi_pcv(
+                name,
+                group,
+                site,
+                rule_set,
+                [str(f) for f in output_summary or []],
+                str(output_url) if output_url else "",
+                str(incremental_state) if incremental_state else "",
+                details,
+                cancel,
+            )
+
+        if watch:
+            tf_plans = [str(f) for f in nac_tf_plan or []]
+            if not file and not tf_plans or "-" in tf_plans:
+                raise ValueError(
+                    "Watch mode requires input files (--file or --nac-tf-plan)"
+                )
+            watcher = Watcher(
+                pcv,
+                [str(f) for f in file or []],
+                tf_plans,
+                validate,
+                cache,
+            )
+            watcher.run()
+            return
 
         # Load files if provided
         if file:
-            pcv.load_json_files([str(f) for f in file])
+            pcv.load_json_files([str(f) for f in file], cache)
         if nac_tf_plan:
-            pcv.load_tf_plan(str(nac_tf_plan))
+            pcv.load_tf_plans([str(f) for f in nac_tf_plan])
 
         # Run the pre-change validation
-        pcv.ndi_pcv(
-            name,
-            group,
-            site,
-            suppress_events,
-            str(output_summary) if output_summary else "",
-            str(output_url) if output_url else "",
-        )
+        err, events, _ = validate()
 
     except Exception as e:
         logger.error(f"Error during execution: {e}")
         raise typer.Exit(code=1) from e
+
+    if err is not None or not rule_set.passed(events or []):
+        raise typer.Exit(code=1)
+
+
+def run() -> None:
+    """Entry point dispatching to the validation service if invoked as `nexus-pcv serve`"""
+    if len(sys.argv) > 1 and sys.argv[1] == "serve":
+        from .serve import app as serve_app
+
+        serve_app(args=sys.argv[2:], prog_name="nexus-pcv serve")
+    else:
+        app()
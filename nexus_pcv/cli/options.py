@@ -7,6 +7,9 @@ import typer
 
 # Typer Option definitions for the CLI
 
+# Events suppressed by default, also used by the validation service
+DEFAULT_SUPPRESS_EVENTS = "APP_EPG_NOT_DEPLOYED,APP_EPG_HAS_NO_CONTRACT_IN_ENFORCED_VRF"
+
 hostname_ip = typer.Option(
     ...,
     "-i",
@@ -70,16 +73,33 @@ timeout = typer.Option(
     15,
     "--timeout",
     envvar="PCV_TIMEOUT",
-    help="NDI pre-change validation timeout in minutes.",
+    help="Overall NDI pre-change validation timeout in minutes, including login, submission and retrieval of results.",
+)
+
+max_retries = typer.Option(
+    4,
+    "--max-retries",
+    envvar="PCV_MAX_RETRIES",
+    help="Maximum number of retries of failed NDI requests.",
 )
 
 suppress_events = typer.Option(
-    "APP_EPG_NOT_DEPLOYED,APP_EPG_HAS_NO_CONTRACT_IN_ENFORCED_VRF",
+    DEFAULT_SUPPRESS_EVENTS,
     "--suppress-events",
     envvar="PCV_SUPPRESS_EVENTS",
     help="NDI comma-separated list of events to suppress.",
 )
 
+rules = typer.Option(
+    None,
+    "--rules",
+    envvar="PCV_RULES",
+    help="YAML file with additional event suppression rules and pass/fail gating settings.",
+    exists=True,
+    file_okay=True,
+    dir_okay=False,
+)
+
 file = typer.Option(
     None,
     "-f",
@@ -96,10 +116,11 @@ nac_tf_plan = typer.Option(
     "-t",
     "--nac-tf-plan",
     envvar="PCV_NAC_TF_PLAN",
-    help="NDI proposed change Terraform plan output.",
+    help="NDI proposed change Terraform plan output. Can be repeated to merge the changes of several plans (e.g., workspaces). Use '-' to read from stdin.",
     exists=True,
     file_okay=True,
     dir_okay=False,
+    allow_dash=True,
 )
 
 output_summary = typer.Option(
@@ -107,7 +128,7 @@ output_summary = typer.Option(
     "-o",
     "--output-summary",
     envvar="PCV_OUTPUT_SUMMARY",
-    help="NDI summary of new events/anomalies written to a file.",
+    help="NDI summary of new events/anomalies written to a file. The format is derived from the file extension: `.jsonl` (JSON Lines), `.xml` (JUnit XML), `.sarif` (SARIF), otherwise YAML. Can be used multiple times.",
     file_okay=True,
     dir_okay=False,
 )
@@ -122,6 +143,129 @@ output_url = typer.Option(
     dir_okay=False,
 )
 
+details = typer.Option(
+    False,
+    "--details",
+    envvar="PCV_DETAILS",
+    help="Retrieve objects affected by each event and add them to the summary.",
+)
+
+incremental_state = typer.Option(
+    None,
+    "--incremental-state",
+    envvar="PCV_INCREMENTAL_STATE",
+    help="Directory to store the last validated change. Only changes since then are submitted if the base epoch is unchanged.",
+    file_okay=False,
+    dir_okay=True,
+)
+
+cache_dir = typer.Option(
+    None,
+    "--cache-dir",
+    envvar="PCV_CACHE_DIR",
+    help="Directory to cache loaded objects of JSON files. Unchanged files are loaded from the cache.",
+    file_okay=False,
+    dir_okay=True,
+)
+
+cache_max_size = typer.Option(
+    1024,
+    "--cache-max-size",
+    envvar="PCV_CACHE_MAX_SIZE",
+    help="Maximum size of cache directory in MB. Least recently used files are removed first.",
+)
+
+admission_db = typer.Option(
+    None,
+    "--admission-db",
+    envvar="PCV_ADMISSION_DB",
+    help="SQLite database shared by concurrent nexus-pcv processes to limit the number of concurrent pre-change validations per NDI, insights group and site.",
+    file_okay=True,
+    dir_okay=False,
+)
+
+max_concurrent = typer.Option(
+    1,
+    "--max-concurrent",
+    envvar="PCV_MAX_CONCURRENT",
+    help="Maximum number of concurrent pre-change validations per NDI, insights group and site if --admission-db is used.",
+)
+
+admission_timeout = typer.Option(
+    60,
+    "--admission-timeout",
+    envvar="PCV_ADMISSION_TIMEOUT",
+    help="Maximum time in minutes to wait for a free pre-change validation slot if --admission-db is used.",
+)
+
+fabric_snapshot = typer.Option(
+    None,
+    "--fabric-snapshot",
+    envvar="PCV_FABRIC_SNAPSHOT",
+    help="JSON file(s) with current fabric configuration (e.g. `imdata` export). Changes already matching the fabric are not submitted. Can be used multiple times.",
+    exists=True,
+    file_okay=True,
+    dir_okay=False,
+)
+
+resolver_db = typer.Option(
+    None,
+    "--resolver-db",
+    envvar="PCV_RESOLVER_DB",
+    help="SQLite database to learn classnames of loaded objects and resolve missing classnames. Can be shared across runs.",
+    file_okay=True,
+    dir_okay=False,
+)
+
+prefetch = typer.Option(
+    True,
+    "--prefetch/--no-prefetch",
+    envvar="PCV_PREFETCH",
+    help="Authenticate and look up the base epoch concurrently with loading the input files.",
+)
+
+watch = typer.Option(
+    False,
+    "--watch",
+    envvar="PCV_WATCH",
+    help="Keep running and validate again whenever the input files are modified.",
+)
+
+listen = typer.Option(
+    "127.0.0.1:8080",
+    "--listen",
+    envvar="PCV_LISTEN",
+    help="Validation service listen address (host:port).",
+)
+
+socket = typer.Option(
+    None,
+    "--socket",
+    envvar="PCV_SOCKET",
+    help="Validation service Unix socket path. Overrides --listen.",
+)
+
+workers = typer.Option(
+    8,
+    "--workers",
+    envvar="PCV_WORKERS",
+    help="Validation service maximum number of concurrent jobs.",
+)
+
+site_concurrency = typer.Option(
+    1,
+    "--site-concurrency",
+    envvar="PCV_SITE_CONCURRENCY",
+    help="Validation service maximum number of concurrent jobs per site.",
+)
+
+epoch_cache_ttl = typer.Option(
+    60,
+    "--epoch-cache-ttl",
+    envvar="PCV_EPOCH_CACHE_TTL",
+    help="Validation service time in seconds to cache the last epoch of a site.",
+)
+
 verbosity = typer.Option(
     "WARNING",
     "-v",
@@ -142,9 +286,27 @@ Domain = Annotated[str, domain]
 Group = Annotated[str, group]
 Timeout = Annotated[int, timeout]
 SuppressEvents = Annotated[str, suppress_events]
+Rules = Annotated[Path | None, rules]
 File = Annotated[list[Path] | None, file]
-NacTfPlan = Annotated[Path | None, nac_tf_plan]
-OutputSummary = Annotated[Path | None, output_summary]
+NacTfPlan = Annotated[list[Path] | None, nac_tf_plan]
+OutputSummary = Annotated[list[Path] | None, output_summary]
 OutputUrl = Annotated[Path | None, output_url]
+Details = Annotated[bool, details]
+IncrementalState = Annotated[Path | None, incremental_state]
+MaxRetries = Annotated[int, max_retries]
+Prefetch = Annotated[bool, prefetch]
+Watch = Annotated[bool, watch]
+CacheDir = Annotated[Path | None, cache_dir]
+CacheMaxSize = Annotated[int, cache_max_size]
+ResolverDb = Annotated[Path | None, resolver_db]
+FabricSnapshot = Annotated[list[Path] | None, fabric_snapshot]
+AdmissionDb = Annotated[Path | None, admission_db]
+MaxConcurrent = Annotated[int, max_concurrent]
+AdmissionTimeout = Annotated[int, admission_timeout]
+Listen = Annotated[str, listen]
+Socket = Annotated[str | None, socket]
+Workers = Annotated[int, workers]
+SiteConcurrency = Annotated[int, site_concurrency]
+EpochCacheTtl = Annotated[int, epoch_cache_ttl]
 Verbosity = Annotated[str, verbosity]
 # Version handled directly in main.py
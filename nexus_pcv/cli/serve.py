@@ -0,0 +1,58 @@
+# Copyright: (c) 2022, Daniel Schmidt <danischm@cisco.com>
+
+import logging
+
+import typer
+
+from . import options
+from .main import configure_logging
+
+logger = logging.getLogger(__name__)
+
+app = typer.Typer(
+    help="Run a long-running pre-change validation service sharing a warm NDI session.",
+    add_completion=False,
+)
+
+
+@app.command()
+def serve(
+    hostname_ip: str = options.hostname_ip,
+    username: str = options.username,
+    password: str = options.password,
+    domain: str = options.domain,
+    timeout: int = options.timeout,
+    max_retries: int = options.max_retries,
+    listen: str = options.listen,
+    socket: str | None = options.socket,
+    workers: int = options.workers,
+    site_concurrency: int = options.site_concurrency,
+    epoch_cache_ttl: int = options.epoch_cache_ttl,
+    verbosity: str = options.verbosity,
+) -> None:
+    """Run a long-running pre-change validation service sharing a warm NDI session.
+
+    Jobs are submitted with `POST /jobs` and polled with `GET /jobs/<id>`.
+    """
+    configure_logging(verbosity)
+
+    from nexus_pcv.ndi import NDI
+    from nexus_pcv.retry import RetryPolicy
+    from nexus_pcv.service import ValidationService
+    from nexus_pcv.service import serve as serve_service
+
+    host, _, port = listen.rpartition(":")
+    ndi = NDI(
+        hostname_ip,
+        username,
+        password,
+        domain,
+        timeout,
+        epoch_cache_ttl=epoch_cache_ttl,
+        retry=RetryPolicy(max_attempts=max_retries + 1),
+    )
+    err = ndi.login()
+    if err is not None:
+        raise typer.Exit(code=1)
+    service = ValidationService(ndi, workers, site_concurrency)
+    serve_service(service, host or "127.0.0.1", int(port), socket or "")
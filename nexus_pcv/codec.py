@@ -0,0 +1,47 @@
+# Copyright: (c) 2022, Daniel Schmidt <danischm@cisco.com>
+
+import json
+from collections.abc import Callable
+from json.encoder import encode_basestring_ascii  # type: ignore[attr-defined]
+from typing import Any
+
+# Use a fast optional JSON backend for decoding if installed
+_backend_loads: Callable[[str | bytes], Any] | None
+_backend_error: type[Exception]
+
+try:
+    import orjson
+
+    BACKEND = "orjson"
+    _backend_loads = orjson.loads
+    _backend_error = orjson.JSONDecodeError
+except ImportError:
+    try:
+        import msgspec
+
+        BACKEND = "msgspec"
+        _backend_loads = msgspec.json.decode
+        _backend_error = msgspec.DecodeError
+    except ImportError:
+        BACKEND = "json"
+        _backend_loads = None
+        _backend_error = ValueError
+
+
+def loads(data: str | bytes) -> Any:
+    """Deserialize JSON document, falling back to the standard library if rejected by backend"""
+    if _backend_loads is not None:
+        try:
+            return _backend_loads(data)
+        except _backend_error:
+            pass
+    return json.loads(data)
+
+
+def dumps(obj: Any) -> str:
+    """Serialize object to JSON, identical to `json.dumps(obj)`"""
+    if type(obj) is str:
+        # the C string encoder of the standard library beats every backend
+        # for scalars as it avoids the bytes round trip
+        return str(encode_basestring_ascii(obj))
+    return json.dumps(obj)
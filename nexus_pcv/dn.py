@@ -0,0 +1,39 @@
+# Copyright: (c) 2022, Daniel Schmidt <danischm@cisco.com>
+
+import functools
+import sys
+
+
+@functools.lru_cache(maxsize=131072)
+def parse_dn(dn: str) -> tuple[str, ...]:
+    """Parse DN into tuple of interned RNs, ignoring delimiters ('/') within brackets
+
+    E.g. `uni/tn-A/ap-B/epg-C/rsdomAtt-[uni/phys-X]` is parsed into
+    `("uni", "tn-A", "ap-B", "epg-C", "rsdomAtt-[uni/phys-X]")`.
+    """
+    if "[" not in dn:
+        return tuple(map(sys.intern, dn.split("/")))
+    rns = []
+    escaped = 0
+    start = 0
+    for index, c in enumerate(dn):
+        if c == "[":
+            escaped += 1
+        elif c == "]":
+            escaped -= 1
+        elif c == "/" and escaped == 0:
+            rns.append(sys.intern(dn[start:index]))
+            start = index + 1
+    rns.append(sys.intern(dn[start:]))
+    return tuple(rns)
+
+
+def parent_dn(dn: str) -> str:
+    """Return DN of parent object, empty if DN has a single RN"""
+    return "/".join(parse_dn(dn)[:-1])
+
+
+def split_rn(rn: str) -> tuple[str, str | None]:
+    """Split RN into prefix and naming value, e.g. `tn-A` into `("tn", "A")`"""
+    prefix, delimiter, value = rn.partition("-")
+    return prefix, value if delimiter else None
@@ -1,13 +1,19 @@
 # Copyright: (c) 2022, Daniel Schmidt <danischm@cisco.com>
 
+import concurrent.futures
 import json
 import logging
+import threading
 import time
-from datetime import datetime
+import uuid
+from collections.abc import Callable, Collection, Iterator
 from typing import Any
 
 import httpx
-import yaml
+
+from . import codec
+from .retry import RETRY_STATUS_CODES, CircuitBreaker, RetryPolicy, response_text
+from .rules import RuleSet
 
 logger = logging.getLogger(__name__)
 
@@ -20,6 +26,8 @@ class NDI:
         password: str,
         domain: str,
         timeout: int,
+        epoch_cache_ttl: int = 0,
+        retry: RetryPolicy | None = None,
     ):
         self.hostname_ip = hostname_ip
         self.api_url = (
@@ -33,173 +41,503 @@ class NDI:
         # SSL verification disabled in Client() constructor
         self.authenticated = False
         self.site_uuid = ""
+        # (group, site) -> (epoch ID, site UUID, lookup time)
+        self.epoch_cache_ttl = epoch_cache_ttl
+        self.epochs: dict[tuple[str, str], tuple[str, str, float]] = {}
+        self.retry = retry if retry is not None else RetryPolicy()
+        self.breaker = CircuitBreaker()
+        self.login_url = f"https://{hostname_ip}/login"
+
+    def _request(
+        self,
+        method: str,
+        url: str,
+        idempotent: bool = True,
+        deadline: float | None = None,
+        **kwargs: Any,
+    ) -> httpx.Response:
+        """Helper function to send request with retries, re-login and circuit breaking
+
+        Non-idempotent requests are only retried if NDI did not process them
+        (connection failures and 429 responses). Raises `TimeoutError` if the
+        request cannot be completed before the deadline (`time.monotonic()`).
+        """
+        send: Callable[..., httpx.Response] = getattr(self.session, method)
+        relogin = url != self.login_url
+        start = time.monotonic()
+        attempt = 0
+        while True:
+            if not self.breaker.allow():
+                raise RuntimeError(f"NDI '{self.hostname_ip}' is unavailable")
+            if deadline is not None:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    raise TimeoutError("Deadline exceeded before NDI request")
+                if (
+                    self.session.timeout.read is None
+                    or remaining < self.session.timeout.read
+                ):
+                    kwargs["timeout"] = remaining
+            resp = None
+            try:
+                resp = send(url, **kwargs)
+            except httpx.TransportError as e:
+                self.breaker.failure()
+                error: Exception = e
+                reason = type(e).__name__
+                retryable = idempotent or isinstance(
+                    e, (httpx.ConnectError, httpx.ConnectTimeout, httpx.PoolTimeout)
+                )
+            else:
+                if resp.status_code == 401 and relogin:
+                    relogin = False
+                    logger.info("NDI session expired, logging in again")
+                    self.authenticated = False
+                    if self.login(deadline) is None:
+                        continue
+                    return resp
+                if resp.status_code >= 500:
+                    self.breaker.failure()
+                else:
+                    self.breaker.success()
+                if resp.status_code not in RETRY_STATUS_CODES:
+                    return resp
+                reason = f"HTTP {resp.status_code}"
+                retryable = idempotent or resp.status_code == 429
+            delay = self.retry.delay(attempt, resp)
+            attempt += 1
+            if (
+                retryable
+                and deadline is not None
+                and time.monotonic() + delay >= deadline
+            ):
+                raise TimeoutError(
+                    f"NDI request failed ({reason}) and the deadline does not allow retrying"
+                )
+            if (
+                not retryable
+                or attempt >= self.retry.max_attempts
+                or time.monotonic() - start + delay > self.retry.budget
+            ):
+                if resp is not None:
+                    return resp
+                raise error
+            logger.warning(f"NDI request failed ({reason}), retrying in {delay:.1f}s")
+            time.sleep(delay)
 
-    def _login(self) -> httpx.Response | None:
-        """Helper function to authenticate and populate headers"""
+    def login(self, deadline: float | None = None) -> httpx.Response | None:
+        """Authenticate and populate session headers, return response if failed"""
         auth_payload = {
             "userName": self.username,
             "userPasswd": self.password,
             "domain": self.domain,
         }
-        url = f"https://{self.hostname_ip}/login"
-        resp = self.session.post(url, json=auth_payload)
+        resp = self._request(
+            "post", self.login_url, deadline=deadline, json=auth_payload
+        )
         if resp.status_code != 200:
-            logger.error(f"Login failed: {resp.json()}")
+            logger.error(f"Login failed: {response_text(resp)}")
             return resp
         self.authenticated = True
         return None
 
     def get_last_epoch_id(
-        self, name: str, site: str
+        self, name: str, site: str, deadline: float | None = None
     ) -> tuple[httpx.Response | None, str | None]:
         """Get last epoch ID of assurance group"""
+        cached = self.epochs.get((name, site))
+        if cached is not None and time.monotonic() - cached[2] < self.epoch_cache_ttl:
+            self.site_uuid = cached[1]
+            return None, cached[0]
+
         if not self.authenticated:
-            err = self._login()
+            err = self.login(deadline)
             if err is not None:
                 return err, None
 
         url = f"{self.api_url}/events/insightsGroup/{name}/fabric/{site}/epochs?$size=1&$status=FINISHED&$epochType=ONLINE"
-        resp = self.session.get(url)
+        resp = self._request("get", url, deadline=deadline)
         if resp.status_code != 200:
-            logger.error(f"Get epoch id failed: {resp.json()}")
+            logger.error(f"Get epoch id failed: {response_text(resp)}")
             return resp, None
 
         try:
-            epochs = json.loads(resp.content)["value"]["data"]
+            epochs = codec.loads(resp.content)["value"]["data"]
             epoch_id = epochs[0]["epochId"]
             self.site_uuid = epochs[0]["fabricId"]
+            self.epochs[(name, site)] = (epoch_id, self.site_uuid, time.monotonic())
             return None, epoch_id
         except KeyError:
             pass
-        logger.error(f"Epoch ID could not be found: {resp.json()}")
+        logger.error(f"Epoch ID could not be found: {response_text(resp)}")
         return resp, None
 
     def start_pcv(
-        self, name: str, group: str, site: str, json_data: str
+        self,
+        name: str,
+        group: str,
+        site: str,
+        json_data: str,
+        epoch_id: str | None = None,
+        deadline: float | None = None,
     ) -> tuple[httpx.Response | None, str | None]:
         """Start pre-change validation and return job ID"""
         if not self.authenticated:
-            err = self._login()
+            err = self.login(deadline)
             if err is not None:
                 return err, None
 
-        err, epoch_id = self.get_last_epoch_id(group, site)
-        if err is not None:
-            return err, None
+        if epoch_id is None:
+            err, epoch_id = self.get_last_epoch_id(group, site, deadline)
+            if err is not None:
+                return err, None
 
         payload = {}
         payload["name"] = name
-        payload["fabricUuid"] = self.site_uuid
+        payload["fabricUuid"] = self.epochs.get((group, site), ("", self.site_uuid))[1]
         payload["baseEpochId"] = str(epoch_id)
         payload["allowUnsupportedObjectModification"] = "true"
-        payload["uploadedFileName"] = "tmp.json"
+        # unique file name to recognize the submission if its outcome is unknown
+        file_name = f"{uuid.uuid4().hex}.json"
+        payload["uploadedFileName"] = file_name
         payload["assuranceEntityName"] = site
 
         files = [
             ("data", ("blob", json.dumps(payload), "application/json")),
-            ("file", ("tmp.json", json_data, "application/json")),
+            ("file", (file_name, json_data, "application/json")),
         ]
 
         url = f"{self.api_url}/config/insightsGroup/{group}/fabric/{site}/prechangeAnalysis/fileChanges"
-        resp = self.session.post(url, files=files)
+        attempt = 1
+        while True:
+            # connection failures and 429 responses are retried by _request()
+            try:
+                resp = self._request(
+                    "post", url, idempotent=False, deadline=deadline, files=files
+                )
+            except (httpx.ConnectError, httpx.ConnectTimeout, httpx.PoolTimeout):
+                raise
+            except httpx.TransportError as e:
+                error: Exception | None = e
+                reason = type(e).__name__
+            else:
+                if resp.status_code < 500:
+                    break
+                error = None
+                reason = f"HTTP {resp.status_code}"
+            # outcome of submission unknown, only resubmit if no analysis was created
+            _, job_id = self._find_pcv_job(group, site, name, file_name, deadline)
+            if job_id is not None:
+                logger.info(f"Pre-change analysis started. Job ID: {job_id}")
+                return None, job_id
+            if attempt >= self.retry.max_attempts:
+                if error is not None:
+                    raise error
+                break
+            delay = self.retry.delay(attempt)
+            if deadline is not None and time.monotonic() + delay >= deadline:
+                raise TimeoutError(
+                    f"Start pre-change analysis failed ({reason}) and the deadline does not allow retrying"
+                )
+            logger.warning(
+                f"Start pre-change analysis failed ({reason}), retrying in {delay:.1f}s"
+            )
+            time.sleep(delay)
+            attempt += 1
         if resp.status_code != 200:
-            logger.error(f"Start pre-change analysis failed: {resp.json()}")
+            logger.error(f"Start pre-change analysis failed: {response_text(resp)}")
             return resp, None
 
         try:
-            job_id = json.loads(resp.content)["value"]["data"]["jobId"]
+            job_id = codec.loads(resp.content)["value"]["data"]["jobId"]
             logger.info(f"Pre-change analysis started. Job ID: {job_id}")
             return None, job_id
         except KeyError:
             pass
-        logger.error(f"Job ID could not be found: {resp.json()}")
+        logger.error(f"Job ID could not be found: {response_text(resp)}")
         return resp, None
 
+    def _find_pcv_job(
+        self,
+        group: str,
+        site: str,
+        name: str,
+        file_name: str,
+        deadline: float | None = None,
+    ) -> tuple[httpx.Response | None, str | None]:
+        """Helper function to get job ID of pre-change analysis submitted with name and file name"""
+        url = f"{self.api_url}/config/insightsGroup/{group}/fabric/{site}/prechangeAnalysis"
+        try:
+            resp = self._request("get", url, deadline=deadline)
+        except httpx.TransportError as e:
+            logger.warning(f"Get pre-change analyses failed: {e}")
+            return None, None
+        if resp.status_code != 200:
+            logger.warning(f"Get pre-change analyses failed: {response_text(resp)}")
+            return resp, None
+        try:
+            jobs = codec.loads(resp.content)["value"]["data"]
+            for job in jobs:
+                if job.get("name") == name and job.get("uploadedFileName") == file_name:
+                    return None, str(job["jobId"])
+            return None, None
+        except (KeyError, TypeError, AttributeError, ValueError):
+            logger.warning(
+                f"Pre-change analyses could not be found: {response_text(resp)}"
+            )
+            return resp, None
+
     def wait_pcv(
-        self, group: str, site: str, job_id: str
+        self,
+        group: str,
+        site: str,
+        job_id: str,
+        cancel: threading.Event | None = None,
+        deadline: float | None = None,
     ) -> tuple[httpx.Response | None, str | None]:
-        """Wair for pre-change validation to complete and return epoch job ID"""
+        """Wait for pre-change validation to complete and return epoch job ID
+
+        Waits until the deadline (`time.monotonic()`), by default for `timeout`
+        minutes, and raises `TimeoutError` afterwards. Returns no epoch job ID
+        if waiting has been cancelled.
+        """
+        if deadline is None:
+            deadline = time.monotonic() + self.timeout * 60
         if not self.authenticated:
-            err = self._login()
+            err = self.login(deadline)
             if err is not None:
                 return err, None
 
-        status = None
-        start_time = datetime.now()
+        url = f"{self.api_url}/config/insightsGroup/{group}/fabric/{site}/prechangeAnalysis/{job_id}"
         while True:
-            url = f"{self.api_url}/config/insightsGroup/{group}/fabric/{site}/prechangeAnalysis/{job_id}"
-            resp = self.session.get(url)
+            resp = self._request("get", url, deadline=deadline)
             if resp.status_code != 200:
-                logger.error(f"Get pre-change analysis status failed: {resp.json()}")
+                logger.error(
+                    f"Get pre-change analysis status failed: {response_text(resp)}"
+                )
                 return resp, None
             try:
-                status = json.loads(resp.content)["value"]["data"]["analysisStatus"]
-                if status == "COMPLETED":
+                data = codec.loads(resp.content)["value"]["data"]
+                if data["analysisStatus"] == "COMPLETED":
                     break
             except KeyError:
-                logger.error(f"Status could not be found: {resp.json()}")
-            delta_minutes = (datetime.now() - start_time).total_seconds() / 60
-            if delta_minutes > self.timeout:
-                break
+                logger.error(f"Status could not be found: {response_text(resp)}")
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                raise TimeoutError(
+                    f"Pre-change analysis did not complete in time. Job ID: {job_id}"
+                )
             logger.info("Waiting for pre-change analysis to complete ...")
-            time.sleep(10)
+            if cancel is None:
+                time.sleep(min(remaining, 10))
+            elif cancel.wait(min(remaining, 10)):
+                logger.info(
+                    f"Stopped waiting for pre-change analysis. Job ID: {job_id}"
+                )
+                return None, None
 
         try:
-            epoch_job_id = json.loads(resp.content)["value"]["data"]["epochDeltaJobId"]
+            epoch_job_id = data["epochDeltaJobId"]
             logger.info(f"Pre-change analysis completed. Epoch job ID: {epoch_job_id}")
             return None, epoch_job_id
         except KeyError:
             pass
-        logger.error(f"Epoch job ID could not be found: {resp.json()}")
+        logger.error(f"Epoch job ID could not be found: {response_text(resp)}")
         return resp, None
 
-    def get_pcv_results(
-        self, group: str, site: str, epoch_job_id: str, suppress_events: str
-    ) -> tuple[httpx.Response | None, list[Any] | None]:
-        """Retrieve pre-change validation results"""
+    def delete_pcv(
+        self, group: str, site: str, job_id: str, deadline: float | None = None
+    ) -> httpx.Response | None:
+        """Delete (and stop if still running) pre-change validation"""
         if not self.authenticated:
-            err = self._login()
+            err = self.login(deadline)
             if err is not None:
-                return err, None
+                return err
+
+        url = f"{self.api_url}/config/insightsGroup/{group}/fabric/{site}/prechangeAnalysis/{job_id}"
+        resp = self._request("delete", url, deadline=deadline)
+        if resp.status_code not in (200, 204):
+            logger.error(f"Delete pre-change analysis failed: {response_text(resp)}")
+            return resp
+        logger.info(f"Pre-change analysis deleted. Job ID: {job_id}")
+        return None
 
-        suppress_events_list = suppress_events.split(",")
+    def iter_pcv_result_pages(
+        self,
+        group: str,
+        site: str,
+        epoch_job_id: str,
+        page_size: int = 100,
+        deadline: float | None = None,
+    ) -> Iterator[tuple[httpx.Response, list[Any] | None]]:
+        """Retrieve pre-change validation results page by page
+
+        Yields the response and its entries, or `None` as entries and stops if
+        a page could not be retrieved.
+        """
+        url = f"{self.api_url}/epochDelta/insightsGroup/{group}/fabric/{site}/job/{epoch_job_id}/health/view/aggregateTable"
+        params: dict[str, str | int] = {
+            "epochStatus": "EPOCH2_ONLY",
+            "$size": page_size,
+        }
+        page = 0
+        count = 0
+        first_entry = None
+        while True:
+            resp = self._request(
+                "get", url, deadline=deadline, params={**params, "$page": page}
+            )
+            if resp.status_code != 200:
+                logger.error(f"Get PCV results failed: {response_text(resp)}")
+                yield resp, None
+                return
+            try:
+                data = codec.loads(resp.content)
+                entries = data["entries"]
+            except KeyError:
+                logger.error(f"Could not find events: {response_text(resp)}")
+                yield resp, None
+                return
+            # stop if pagination is not supported and the same page is returned again
+            if page > 0 and entries and entries[0] == first_entry:
+                return
+            first_entry = entries[0] if entries else None
+            count += len(entries)
+            yield resp, entries
+            total = data.get("totalItemsCount")
+            if len(entries) < page_size or (total is not None and count >= int(total)):
+                return
+            page += 1
 
-        url = f"{self.api_url}/epochDelta/insightsGroup/{group}/fabric/{site}/job/{epoch_job_id}/health/view/aggregateTable?epochStatus=EPOCH2_ONLY"
-        resp = self.session.get(url)
+    def get_pcv_affected_objects(
+        self,
+        group: str,
+        site: str,
+        epoch_job_id: str,
+        mnemonic: str,
+        deadline: float | None = None,
+    ) -> tuple[httpx.Response | None, list[str] | None]:
+        """Retrieve DNs of objects affected by an anomaly raised by a pre-change validation"""
+        url = f"{self.api_url}/epochDelta/insightsGroup/{group}/fabric/{site}/job/{epoch_job_id}/health/view/individualTable"
+        params = {"epochStatus": "EPOCH2_ONLY", "$mnemonicTitle": mnemonic}
+        resp = self._request("get", url, deadline=deadline, params=params)
         if resp.status_code != 200:
-            logger.error(f"Get PCV results failed: {resp.json()}")
+            logger.error(f"Get PCV anomaly details failed: {response_text(resp)}")
             return resp, None
 
-        event_list = []
+        dns: list[str] = []
         try:
-            for event in json.loads(resp.content)["entries"]:
-                if int(event["count"]) > 0:
-                    if (
-                        str(event.get("severity")) == "info"
-                        or str(event.get("mnemonicTitle")) in suppress_events_list
-                    ):
-                        continue
-                    event_list.append(
-                        {
-                            "Category": event.get("category").title(),
-                            "Count": event.get("count"),
-                            "Description": event.get("anomalyStr"),
-                            "Severity": event.get("severity"),
-                        }
-                    )
+            for entry in codec.loads(resp.content)["entries"]:
+                for obj in entry.get("affectedObjects") or [entry]:
+                    if isinstance(obj, dict):
+                        dn = obj.get("dn") or obj.get("objectDn")
+                    else:
+                        dn = obj
+                    if dn and dn not in dns:
+                        dns.append(str(dn))
         except KeyError:
-            logger.error(f"Could not find events: {resp.json()}")
+            logger.error(f"Could not find anomaly details: {response_text(resp)}")
             return resp, None
-        if event_list:
-            logger.error(
-                f"The following anomalies have been raised:\n{yaml.dump(event_list)}"
-            )
+        return None, dns
+
+    def get_pcv_results(
+        self,
+        group: str,
+        site: str,
+        epoch_job_id: str,
+        suppress_events: str | Collection[str] | RuleSet,
+        on_event: Callable[[dict[str, Any]], None] | None = None,
+        page_size: int = 100,
+        details: bool = False,
+        detail_workers: int = 8,
+        deadline: float | None = None,
+    ) -> tuple[httpx.Response | None, list[Any] | None]:
+        """Retrieve pre-change validation results
+
+        Events are suppressed according to the given rule set or list of
+        mnemonics (in addition to `info` events). Each reported event is passed
+        to `on_event` as soon as its page has been retrieved. If `details` is
+        set or rules match affected object DNs, the affected objects of each
+        event are retrieved concurrently and added to the event, and events are
+        passed to `on_event` in order once all pages have been retrieved.
+        """
+        if not self.authenticated:
+            err = self.login(deadline)
+            if err is not None:
+                return err, None
+
+        if isinstance(suppress_events, RuleSet):
+            rules = suppress_events
+        else:
+            rules = RuleSet.from_suppress_events(suppress_events)
+        if rules.matches_dns and not details:
+            # the aggregated results do not contain affected objects
+            logger.info("Retrieving affected objects to apply DN suppression rules")
+            details = True
+
+        event_list = []
+
+        def report(event: dict[str, Any]) -> None:
+            item = {
+                "Category": str(event.get("category")).title(),
+                "Count": event.get("count"),
+                "Description": event.get("anomalyStr"),
+                "Severity": event.get("severity"),
+            }
+            if "affectedObjects" in event:
+                item["Affected Objects"] = event["affectedObjects"]
+            event_list.append(item)
+            if on_event is not None:
+                on_event(item)
+
+        with concurrent.futures.ThreadPoolExecutor(
+            max_workers=detail_workers if details else 1
+        ) as executor:
+            pending = []
+            for resp, entries in self.iter_pcv_result_pages(
+                group, site, epoch_job_id, page_size, deadline
+            ):
+                if entries is None:
+                    executor.shutdown(cancel_futures=True)
+                    return resp, None
+                try:
+                    for event in entries:
+                        if int(event["count"]) > 0:
+                            if rules.suppressed(event):
+                                continue
+                            if not details:
+                                report(event)
+                                continue
+                            future = executor.submit(
+                                self.get_pcv_affected_objects,
+                                group,
+                                site,
+                                epoch_job_id,
+                                str(event.get("mnemonicTitle")),
+                                deadline,
+                            )
+                            pending.append((event, future))
+                except KeyError:
+                    logger.error(f"Could not find events: {response_text(resp)}")
+                    executor.shutdown(cancel_futures=True)
+                    return resp, None
+
+            for event, future in pending:
+                err, dns = future.result()
+                if err is not None:
+                    executor.shutdown(cancel_futures=True)
+                    return err, None
+                # suppression rules matching affected objects can only be applied now
+                event["affectedObjects"] = dns
+                if not rules.suppressed(event):
+                    report(event)
+
         return None, event_list
 
     def get_pcv_url(self) -> tuple[httpx.Response | None, str | None]:
         """Get URL pointing to pre-change validation results"""
         if not self.authenticated:
-            err = self._login()
+            err = self.login()
             if err is not None:
                 return err, None
 
@@ -1,19 +1,93 @@
 # Copyright: (c) 2022, Daniel Schmidt <danischm@cisco.com>
 
+import concurrent.futures
+import contextlib
 import json
 import logging
+import multiprocessing
+import os
 import re
-from typing import Any
+import sys
+import threading
+import time
+from collections.abc import Collection, Iterable
+from typing import IO, Any
 
 import httpx
-import yaml
 
+from . import codec
+from .admission import AdmissionController
 from .apic import ApicObject
+from .cache import InventoryCache
 from .const import RN_PREFIX_CLASSNAME_MAPPINGS
+from .dn import parse_dn, split_rn
 from .ndi import NDI
+from .resolver import ResolverStore
+from .rules import RuleSet
+from .snapshot import SnapshotStore
+from .tfplan import iter_resource_changes, read_resource_changes
+from .writers import EventWriter, YamlEventWriter, create_event_writer
 
 logger = logging.getLogger(__name__)
 
+# Time in seconds to delete an abandoned pre-change analysis
+DELETE_TIMEOUT = 30
+
+# Proposed changes accepted by `PCV.load()`
+Changes = ApicObject | dict[str, Any] | Iterable[dict[str, Any]] | IO[Any]
+
+
+class PCVResult:
+    """Result of a pre-change validation
+
+    `status` is one of `skipped` (no changes to validate), `passed`, `failed`
+    (events failing the rule set have been raised), `cancelled`, `timeout`
+    or `error` (NDI request failed, see `error`).
+    """
+
+    def __init__(self, name: str, group: str, site: str):
+        self.name = name
+        self.group = group
+        self.site = site
+        self.status = "skipped"
+        self.error: httpx.Response | None = None
+        self.epoch_id: str | None = None
+        self.job_id: str | None = None
+        self.epoch_job_id: str | None = None
+        self.events: list[Any] = []
+        self.url: str | None = None
+        # durations in seconds
+        self.timings: dict[str, float] = {}
+
+    @property
+    def passed(self) -> bool:
+        return self.status in ("passed", "skipped")
+
+    @property
+    def error_message(self) -> str | None:
+        """Return error message if the validation did not complete"""
+        if self.error is not None:
+            return f"NDI request failed ({self.error.status_code}): {self.error.text}"
+        if self.status in ("cancelled", "timeout", "error"):
+            return f"Pre-change validation {self.status}"
+        return None
+
+    def to_dict(self) -> dict[str, Any]:
+        """Return JSON serializable result"""
+        return {
+            "name": self.name,
+            "group": self.group,
+            "site": self.site,
+            "status": self.status,
+            "error": self.error_message if self.error is not None else None,
+            "epoch_id": self.epoch_id,
+            "job_id": self.job_id,
+            "epoch_job_id": self.epoch_job_id,
+            "events": self.events,
+            "url": self.url,
+            "timings": self.timings,
+        }
+
 
 class PCV:
     def __init__(
@@ -23,39 +97,96 @@ class PCV:
         password: str,
         domain: str,
         timeout: int,
+        ndi: NDI | None = None,
+        resolver: ResolverStore | None = None,
+        admission: AdmissionController | None = None,
     ):
-        self.ndi = NDI(hostname_ip, username, password, domain, timeout)
+        self.ndi = (
+            ndi
+            if ndi is not None
+            else NDI(hostname_ip, username, password, domain, timeout)
+        )
         self.root = ApicObject("root", {}, [], None)
+        self.resolver = resolver
+        self.fabric: ApicObject | None = None
+        # inputs kept for reloading, filename -> objects of JSON file
+        # or resource changes of Terraform plan
+        self.inputs: dict[str, ApicObject] = {}
+        self.tf_plans: dict[str, list[dict[str, Any]]] = {}
+        self.admission = admission
+        # durations of last pre-change validation in seconds
+        self.timings: dict[str, float] = {}
+        # (group, site) -> pending NDI login and base epoch lookup
+        self.prefetched: dict[
+            tuple[str, str],
+            concurrent.futures.Future[tuple[httpx.Response | None, str | None]],
+        ] = {}
+
+    def prefetch_epoch(self, group: str, site: str) -> None:
+        """Authenticate and look up the base epoch in the background
+
+        Allows hiding the NDI round trips behind loading and serializing the
+        local object tree. The result is only used once an analysis is
+        submitted, errors are reported then.
+        """
+        future: concurrent.futures.Future[tuple[httpx.Response | None, str | None]] = (
+            concurrent.futures.Future()
+        )
 
-    def _resolve_tf_classnames(self, root: ApicObject, tf_plan: Any) -> None:
+        def run() -> None:
+            try:
+                future.set_result(self.ndi.get_last_epoch_id(group, site))
+            except Exception as e:
+                future.set_exception(e)
+
+        self.prefetched[(group, site)] = future
+        # daemon thread to not delay exiting if loading the local tree fails
+        threading.Thread(target=run, name="pcv-prefetch", daemon=True).start()
+
+    def _get_epoch_id(
+        self, group: str, site: str, deadline: float | None = None
+    ) -> tuple[httpx.Response | None, str | None]:
+        """Helper function to get base epoch ID, waiting for a background lookup if started"""
+        future = self.prefetched.pop((group, site), None)
+        if future is not None:
+            timeout = (
+                max(deadline - time.monotonic(), 0) if deadline is not None else None
+            )
+            try:
+                return future.result(timeout)
+            except concurrent.futures.TimeoutError as e:
+                # not an alias of the builtin TimeoutError before Python 3.11
+                raise TimeoutError("Base epoch lookup did not complete in time") from e
+            except TimeoutError:
+                raise
+            except Exception as e:
+                # raised in the background thread, add context of the lookup
+                logger.error(f"Get epoch id failed: {e}")
+                raise RuntimeError(f"Base epoch lookup failed: {e}") from e
+        return self.ndi.get_last_epoch_id(group, site, deadline)
+
+    def _resolve_tf_classnames(
+        self, root: ApicObject, tf_classnames: dict[str, tuple[str | None, str | None]]
+    ) -> None:
         """Helper function to resolve missing class names and key attributes using the Terraform plan"""
         if root.cl is None:
-            dn = root["dn"]
-            for change in tf_plan.get("resource_changes", []):
-                section = (
-                    "after" if change["change"].get("after") is not None else "before"
-                )
-                plan_dn = change["change"].get(section, {}).get("dn")
-                if dn == plan_dn:
-                    logger.debug(f"Resolving classname from Terraform plan for '{dn}'")
-                    root.cl = change["change"].get(section, {}).get("class_name")
-                    name = (
-                        change["change"].get(section, {}).get("content", {}).get("name")
+            dn = str(root["dn"])
+            if dn in tf_classnames:
+                logger.debug(f"Resolving classname from Terraform plan for '{dn}'")
+                root.cl, name = tf_classnames[dn]
+                root.invalidate()
+                if name:
+                    logger.debug(
+                        f"Resolving name attribute from Terraform plan for '{dn}'"
                     )
-                    if name:
-                        logger.debug(
-                            f"Resolving name attribute from Terraform plan for '{dn}'"
-                        )
-                        root.attributes["name"] = name
+                    root.attributes["name"] = name
 
         for child in root.children:
-            self._resolve_tf_classnames(child, tf_plan)
+            self._resolve_tf_classnames(child, tf_classnames)
 
     def _resolve_static_classnames(self, root: ApicObject) -> None:
         """Helper function to resolve missing class names and key attributes using static mappings"""
-        parts = str(root["dn"]).split("/")[-1].split("-", 1)
-        prefix = parts[0]
-        name = parts[1] if len(parts) > 1 else None
+        prefix, name = split_rn(parse_dn(str(root["dn"]))[-1])
         if prefix in RN_PREFIX_CLASSNAME_MAPPINGS:
             mapping = RN_PREFIX_CLASSNAME_MAPPINGS[prefix]
             if root.cl is None:
@@ -63,6 +194,7 @@ class PCV:
                     "Statically resolving classname for '{}'".format(root["dn"])
                 )
                 root.cl = mapping.get("class")
+                root.invalidate()
             if root.cl == mapping.get("class"):
                 for key in mapping.get("keys", []):
                     key_attribute = key.get("attribute")
@@ -81,9 +213,16 @@ class PCV:
                                 )
                             )
                             root.attributes[key_attribute] = mo.group()
+                            root.invalidate()
         for child in root.children:
             self._resolve_static_classnames(child)
 
+    def _resolve_stored_classnames(self, root: ApicObject) -> None:
+        """Helper function to learn classnames and resolve missing ones using the resolver database"""
+        if self.resolver is not None:
+            self.resolver.learn(root)
+            self.resolver.resolve(root)
+
     def _check_classes(self, root: ApicObject) -> None:
         """Helper function to verify if all objects have classnames"""
         if root.cl is None:
@@ -106,100 +245,588 @@ class PCV:
                 self._load_json_objects(child, new_obj)
         return new_obj
 
-    def load_json_files(self, filenames: list[str]) -> None:
-        """Load objects from JSON files into object tree"""
+    def _load_json_document(self, inv: dict[str, Any]) -> list[ApicObject]:
+        """Helper function to load objects of JSON document (APIC object or `imdata` list)"""
+        items = inv["imdata"] if "imdata" in inv else [inv]
+        objects = []
+        for item in items:
+            obj = self._load_json_objects(item)
+            if obj is not None:
+                objects.append(obj)
+        return objects
+
+    def _insert_json(self, inv: dict[str, Any]) -> None:
+        """Helper function to insert objects of JSON document into object tree"""
+        for obj in self._load_json_document(inv):
+            self.root.insert(obj)
+
+    def load_json(self, inventories: list[dict[str, Any]]) -> None:
+        """Load objects from JSON documents (APIC object or `imdata` list) into object tree"""
+        for inv in inventories:
+            self._insert_json(inv)
+        self._resolve_static_classnames(self.root)
+        self._resolve_stored_classnames(self.root)
+        self._check_classes(self.root)
+
+    def load(self, changes: Changes) -> None:
+        """Load proposed changes into object tree
+
+        Changes can be given as JSON document (APIC object or `imdata` list),
+        list of JSON documents, stream of a JSON document or object tree. Object
+        trees are copied.
+        """
+        if isinstance(changes, ApicObject):
+            objects = changes.children if changes.cl == "root" else [changes]
+            for obj in objects:
+                self.root.insert(obj.copy())
+        elif isinstance(changes, dict):
+            self._insert_json(changes)
+        elif hasattr(changes, "read"):
+            self._insert_json(codec.loads(changes.read()))
+        else:
+            for inv in changes:
+                self._insert_json(inv)
+        self._resolve_static_classnames(self.root)
+        self._resolve_stored_classnames(self.root)
+        self._check_classes(self.root)
+
+    def _read_json_file(
+        self, filename: str, cache: InventoryCache | None = None
+    ) -> list[ApicObject]:
+        """Helper function to read objects from JSON file, using the cache if given"""
+        try:
+            with open(filename, "rb") as file:
+                data = file.read()
+            objects = cache.load(data) if cache is not None else None
+            if objects is None:
+                # classnames are resolved once objects have been merged
+                objects = self._load_json_document(codec.loads(data))
+                if cache is not None:
+                    cache.save(data, objects)
+            return objects
+        except Exception as e:
+            logger.error(f"Failed to load JSON file: {filename}")
+            raise RuntimeError(f"Failed to load JSON file '{filename}': {e}") from e
+
+    def load_json_files(
+        self, filenames: list[str], cache: InventoryCache | None = None
+    ) -> None:
+        """Load objects from JSON files into object tree
+
+        If a cache is given, the loaded objects of each file are cached by file
+        content.
+        """
+        for filename in filenames:
+            for obj in self._read_json_file(filename, cache):
+                self.root.insert(obj)
+        self._resolve_static_classnames(self.root)
+        self._resolve_stored_classnames(self.root)
+        self._check_classes(self.root)
+
+    def load_inputs(
+        self,
+        filenames: list[str],
+        tf_plans: list[str] | None = None,
+        modified: Collection[str] | None = None,
+        cache: InventoryCache | None = None,
+    ) -> None:
+        """Load JSON files and Terraform plans into a new object tree
+
+        The objects of each JSON file and the changes of each plan are kept,
+        so that only the `modified` inputs (all if not given) are read again
+        when reloading.
+        """
+        tf_plans = tf_plans or []
+        for filename in filenames:
+            if modified is None or filename in modified or filename not in self.inputs:
+                self.inputs.pop(filename, None)
+                tree = ApicObject("root", {}, [], None)
+                for obj in self._read_json_file(filename, cache):
+                    tree.insert(obj)
+                self.inputs[filename] = tree
+        self.inputs = {f: self.inputs[f] for f in filenames}
+        for filename in tf_plans:
+            if modified is None or filename in modified:
+                self.tf_plans.pop(filename, None)
+        self.tf_plans.update(
+            self._read_tf_plans([f for f in tf_plans if f not in self.tf_plans])
+        )
+        self.tf_plans = {f: self.tf_plans[f] for f in tf_plans}
+
+        self.root = ApicObject("root", {}, [], None)
+        for tree in self.inputs.values():
+            for obj in tree.children:
+                self.root.insert(obj.copy())
+        tf_classnames: dict[str, tuple[str | None, str | None]] = {}
+        for change in self._merge_tf_changes(self.tf_plans):
+            self._load_tf_change(change, tf_classnames)
+        self._resolve_static_classnames(self.root)
+        self._resolve_tf_classnames(self.root, tf_classnames)
+        self._resolve_stored_classnames(self.root)
+        self._check_classes(self.root)
+
+    def load_fabric_snapshot(self, filenames: list[str]) -> None:
+        """Load fabric snapshot (e.g. `imdata` export) from JSON files to skip changes already matching the fabric"""
+        if self.fabric is None:
+            self.fabric = ApicObject("root", {}, [], None)
         for filename in filenames:
             try:
-                with open(filename) as file:
-                    inv = json.loads(file.read())
-                    if "imdata" in inv:
-                        for item in inv["imdata"]:
-                            obj = self._load_json_objects(item)
-                            self.root.insert(obj)
-                    else:
-                        obj = self._load_json_objects(inv)
-                        self.root.insert(obj)
+                with open(filename, "rb") as file:
+                    for obj in self._load_json_document(codec.loads(file.read())):
+                        self.fabric.insert(obj)
             except Exception as e:
-                logger.error(f"Failed to load JSON file: {filename}")
-                raise RuntimeError(f"Failed to load JSON file '{filename}': {e}") from e
+                logger.error(f"Failed to load fabric snapshot file: {filename}")
+                raise RuntimeError(
+                    f"Failed to load fabric snapshot file '{filename}': {e}"
+                ) from e
+        self._resolve_static_classnames(self.fabric)
+
+    def _match_fabric_object(
+        self, obj: ApicObject, parent: ApicObject | None
+    ) -> ApicObject | None:
+        """Helper function to return object of fabric snapshot corresponding to object"""
+        dn = obj.attributes.get("dn")
+        if dn is not None and self.fabric is not None:
+            for o in self.fabric.find(dn=dn, cl=str(obj.cl)):
+                return o
+        if parent is None:
+            return None
+        name = obj.attributes.get("name")
+        for child in parent.children:
+            if child.cl != obj.cl:
+                continue
+            if name is not None:
+                if child.attributes.get("name") == name:
+                    return child
+            elif self._matches_fabric_object(obj, child):
+                return child
+        return None
+
+    def _matches_fabric_object(self, obj: ApicObject, fabric_obj: ApicObject) -> bool:
+        """Helper function to return whether all attributes of object are already set in fabric snapshot"""
+        return all(
+            k == "status" or fabric_obj.attributes.get(k) == v
+            for k, v in obj.attributes.items()
+        )
+
+    def _prune_noops(
+        self, obj: ApicObject, fabric_parent: ApicObject | None
+    ) -> ApicObject | None:
+        """Helper function to return copy of subtree without objects already matching the fabric snapshot"""
+        fabric_obj = self._match_fabric_object(obj, fabric_parent)
+        children = []
+        for child in obj.children:
+            pruned = self._prune_noops(child, fabric_obj)
+            if pruned is not None:
+                children.append(pruned)
+        if not children:
+            if obj.attributes.get("status") == "deleted":
+                if fabric_obj is None:
+                    return None
+            elif fabric_obj is not None and self._matches_fabric_object(
+                obj, fabric_obj
+            ):
+                return None
+        new_obj = ApicObject(obj.cl, dict(obj.attributes), children, None)
+        for child in children:
+            child.parent = new_obj
+        return new_obj
+
+    def load_tf_changes(self, changes: Iterable[dict[str, Any]]) -> None:
+        """Load changed objects from Terraform plan resource changes into object tree"""
+        tf_classnames: dict[str, tuple[str | None, str | None]] = {}
+        for change in changes:
+            if change.get("type") == "aci_rest_managed":
+                self._load_tf_change(change["change"], tf_classnames)
         self._resolve_static_classnames(self.root)
+        self._resolve_tf_classnames(self.root, tf_classnames)
+        self._resolve_stored_classnames(self.root)
         self._check_classes(self.root)
 
-    def load_tf_plan(self, filename: str) -> None:
-        """Load changed objects from Terraform plan into object tree"""
+    def _read_tf_plan(
+        self, filename: str, root: ApicObject
+    ) -> dict[str, tuple[str | None, str | None]]:
+        """Helper function to stream changed objects of Terraform plan into object tree and return classnames of plan"""
+        tf_classnames: dict[str, tuple[str | None, str | None]] = {}
         try:
-            with open(filename) as file:
-                tf_plan = json.load(file)
+            with (
+                contextlib.nullcontext(sys.stdin) if filename == "-" else open(filename)
+            ) as file:
+                for change in iter_resource_changes(file, types={"aci_rest_managed"}):
+                    self._load_tf_change(change["change"], tf_classnames, root)
         except Exception as e:
             logger.error(f"Failed to load Terraform plan file: {filename}")
             raise RuntimeError(
                 f"Failed to load Terraform plan file '{filename}': {e}"
             ) from e
+        return tf_classnames
 
-        for change in tf_plan.get("resource_changes", []):
-            if change.get("type") == "aci_rest_managed":
-                action = change["change"].get("actions", [])
-                if "create" in action or "update" in action or "delete" in action:
-                    if "delete" in action:
-                        classname = change["change"].get("before", {}).get("class_name")
-                        attributes = {}
-                        attributes = change["change"].get("before", {}).get("content")
-                        attributes["status"] = "deleted"
-                        attributes["dn"] = change["change"].get("before", {}).get("dn")
+    def load_tf_plan(self, filename: str) -> None:
+        """Load changed objects from Terraform plan into object tree
+
+        The plan is streamed and only `aci_rest_managed` resource changes are
+        decoded. Use `-` as filename to read the plan from stdin.
+        """
+        tf_classnames = self._read_tf_plan(filename, self.root)
+
+        self._resolve_static_classnames(self.root)
+        self._resolve_tf_classnames(self.root, tf_classnames)
+        self._resolve_stored_classnames(self.root)
+        self._check_classes(self.root)
+
+    def _read_tf_plans(
+        self, filenames: Collection[str], workers: int | None = None
+    ) -> dict[str, list[dict[str, Any]]]:
+        """Helper function to read `aci_rest_managed` resource changes of Terraform plans, in worker processes if several"""
+        plans: dict[str, list[dict[str, Any]]] = {}
+        types = {"aci_rest_managed"}
+        workers = min(workers or os.cpu_count() or 1, len(filenames))
+        with contextlib.ExitStack() as stack:
+            futures = {}
+            if workers > 1:
+                # spawn workers as forking is unsafe with the prefetch thread running
+                executor = stack.enter_context(
+                    concurrent.futures.ProcessPoolExecutor(
+                        workers, mp_context=multiprocessing.get_context("spawn")
+                    )
+                )
+                stack.callback(executor.shutdown, cancel_futures=True)
+                futures = {
+                    f: executor.submit(read_resource_changes, f, types)
+                    for f in filenames
+                    if f != "-"
+                }
+            for filename in filenames:
+                try:
+                    if filename in futures:
+                        changes = futures[filename].result()
+                    elif filename == "-":
+                        changes = list(iter_resource_changes(sys.stdin, types=types))
                     else:
-                        classname = change["change"].get("after", {}).get("class_name")
-                        attributes = change["change"].get("after", {}).get("content")
-                        attributes["dn"] = change["change"].get("after", {}).get("dn")
-                    attributes = {
-                        k: v
-                        for (k, v) in attributes.items()
-                        if v != "" and v is not None
-                    }
-                    obj = ApicObject(classname, attributes, [], None)
-                    self.root.insert(obj)
+                        changes = read_resource_changes(filename, types)
+                except Exception as e:
+                    logger.error(f"Failed to load Terraform plan file: {filename}")
+                    raise RuntimeError(
+                        f"Failed to load Terraform plan file '{filename}': {e}"
+                    ) from e
+                plans[filename] = [c["change"] for c in changes]
+        return plans
+
+    def _merge_tf_changes(
+        self, plans: dict[str, list[dict[str, Any]]]
+    ) -> list[dict[str, Any]]:
+        """Helper function to merge resource changes of Terraform plans, rejecting conflicting changes of the same DN"""
+        merged: dict[str, tuple[str, str, dict[str, Any]]] = {}
+        changes = []
+        conflicts = []
+        for filename, plan in plans.items():
+            for change in plan:
+                section = "after" if change.get("after") is not None else "before"
+                dn = (change.get(section) or {}).get("dn")
+                actions = change.get("actions") or []
+                if dn is None or not {"create", "update", "delete"} & set(actions):
+                    # no-op and read entries only contribute classnames
+                    changes.append(change)
+                    continue
+                key = json.dumps(
+                    [change.get("actions"), change.get(section)], sort_keys=True
+                )
+                if dn in merged and merged[dn][0] != filename:
+                    if merged[dn][1] != key:
+                        conflicts.append(f"'{dn}' ({merged[dn][0]}, {filename})")
+                    continue
+                merged[dn] = (filename, key, change)
+                changes.append(change)
+        if conflicts:
+            error_msg = "Conflicting changes in Terraform plans: " + ", ".join(
+                conflicts
+            )
+            logger.error(error_msg)
+            raise RuntimeError(error_msg)
+        return changes
+
+    def load_tf_plans(self, filenames: list[str], workers: int | None = None) -> None:
+        """Load changed objects from multiple Terraform plans into object tree
 
+        Plans are parsed concurrently by up to `workers` processes (number of
+        CPUs by default) and merged. Changes of the same DN in several plans
+        have to be identical, unless they do not modify the object (e.g. no-op).
+        """
+        if len(filenames) == 1:
+            self.load_tf_plan(filenames[0])
+            return
+        tf_classnames: dict[str, tuple[str | None, str | None]] = {}
+        changes = self._merge_tf_changes(self._read_tf_plans(filenames, workers))
+        for change in changes:
+            self._load_tf_change(change, tf_classnames)
         self._resolve_static_classnames(self.root)
-        self._resolve_tf_classnames(self.root, tf_plan)
+        self._resolve_tf_classnames(self.root, tf_classnames)
+        self._resolve_stored_classnames(self.root)
         self._check_classes(self.root)
 
-    def _write_pcv_events(self, events: list[Any], file: str) -> None:
-        with open(file, "w") as fh:
-            fh.write(yaml.dump(events, default_flow_style=False))
+    def _load_tf_change(
+        self,
+        change: dict[str, Any],
+        tf_classnames: dict[str, tuple[str | None, str | None]],
+        root: ApicObject | None = None,
+    ) -> None:
+        """Helper function to load a single Terraform resource change into object tree"""
+        section = "after" if change.get("after") is not None else "before"
+        values = change.get(section, {})
+        if values.get("dn") is not None:
+            tf_classnames[values["dn"]] = (
+                values.get("class_name"),
+                (values.get("content") or {}).get("name"),
+            )
+        action = change.get("actions", [])
+        if "create" in action or "update" in action or "delete" in action:
+            if "delete" in action:
+                classname = change.get("before", {}).get("class_name")
+                attributes = dict(change.get("before", {}).get("content"))
+                attributes["status"] = "deleted"
+                attributes["dn"] = change.get("before", {}).get("dn")
+            else:
+                classname = change.get("after", {}).get("class_name")
+                attributes = dict(change.get("after", {}).get("content"))
+                attributes["dn"] = change.get("after", {}).get("dn")
+            attributes = {
+                k: v for (k, v) in attributes.items() if v != "" and v is not None
+            }
+            obj = ApicObject(classname, attributes, [], None)
+            (root if root is not None else self.root).insert(obj)
+
+    def _open_event_writers(
+        self, stack: contextlib.ExitStack, files: list[str]
+    ) -> tuple[YamlEventWriter, list[EventWriter]]:
+        """Helper function to open event writers of summary files
+
+        Events are rendered to YAML once by the first YAML writer, which is
+        also used for logging if no YAML summary file is requested.
+        """
+        writers = [create_event_writer(f) for f in files]
+        yaml_writer = next((w for w in writers if isinstance(w, YamlEventWriter)), None)
+        if yaml_writer is None:
+            yaml_writer = YamlEventWriter(None)
+            writers.append(yaml_writer)
+        for writer in writers:
+            stack.enter_context(writer)
+        return yaml_writer, writers
+
+    def _admission_slot(
+        self, group: str, site: str
+    ) -> contextlib.AbstractContextManager[float]:
+        """Helper function to hold a pre-change validation slot of the admission controller, if any"""
+        if self.admission is None:
+            return contextlib.nullcontext(0.0)
+        return self.admission.slot(f"{self.ndi.hostname_ip}/{group}/{site}")
 
     def _write_pcv_url(self, url: str, file: str) -> None:
         with open(file, "w") as fh:
             fh.write(url)
 
+    def validate(
+        self,
+        name: str,
+        group: str,
+        site: str,
+        rules: str | RuleSet = "",
+        incremental_state: str = "",
+        details: bool = False,
+        writers: Iterable[EventWriter] = (),
+        cancel: threading.Event | None = None,
+        deadline: float | None = None,
+    ) -> PCVResult:
+        """Trigger an NDI pre-change validation of the loaded changes
+
+        Reported events are written to the given (already opened) event
+        writers while being retrieved, the writers are failed if the validation
+        does not complete. The validation has to complete before
+        the deadline (`time.monotonic()`), by default within `timeout` minutes
+        plus the time waited for an admission slot. If `cancel` is set, the
+        deadline passes or the validation is interrupted while the analysis is
+        running, it is deleted on NDI.
+        """
+        if isinstance(rules, str):
+            rules = RuleSet.from_suppress_events(rules)
+        result = PCVResult(name, group, site)
+        self.timings = result.timings
+        if deadline is None:
+            deadline = time.monotonic() + self.ndi.timeout * 60
+        writers = list(writers)
+        try:
+            self._validate(
+                result, rules, incremental_state, details, writers, cancel, deadline
+            )
+        except BaseException as e:
+            if result.job_id is not None and result.epoch_job_id is None:
+                self._delete_abandoned_pcv(group, site, str(result.job_id))
+            if not isinstance(e, TimeoutError):
+                raise
+            logger.error(f"Pre-change validation timed out: {e}")
+            result.status = "timeout"
+        message = result.error_message
+        if message is not None:
+            for writer in writers:
+                writer.fail(message)
+        return result
+
+    def _delete_abandoned_pcv(self, group: str, site: str, job_id: str) -> None:
+        """Helper function to delete a pre-change analysis no longer waited for"""
+        logger.warning(f"Deleting abandoned pre-change analysis. Job ID: {job_id}")
+        try:
+            self.ndi.delete_pcv(
+                group, site, job_id, deadline=time.monotonic() + DELETE_TIMEOUT
+            )
+        except Exception as e:
+            logger.error(f"Failed to delete pre-change analysis {job_id}: {e}")
+
+    def _validate(
+        self,
+        result: PCVResult,
+        rules: RuleSet,
+        incremental_state: str,
+        details: bool,
+        writers: Iterable[EventWriter],
+        cancel: threading.Event | None,
+        deadline: float,
+    ) -> None:
+        """Helper function to run pre-change validation, updating result"""
+        name, group, site = result.name, result.group, result.site
+        if not len(self.root.children):
+            logger.info("No updates planned. No need to trigger a pre-change analysis.")
+            return
+        proposed = tree = self.root.children[0]
+        if self.fabric is not None:
+            pruned = self._prune_noops(proposed, None)
+            if pruned is None:
+                logger.info(
+                    "No updates planned. No need to trigger a pre-change analysis."
+                )
+                return
+            proposed = pruned
+        store = SnapshotStore(incremental_state) if incremental_state else None
+        if store is not None:
+            result.error, result.epoch_id = self._get_epoch_id(group, site, deadline)
+            if result.error is not None:
+                result.status = "error"
+                return
+            snapshot = store.load(group, site)
+            if snapshot is None:
+                logger.info("No validated snapshot found. Submitting full change.")
+            elif snapshot[0] != str(result.epoch_id):
+                logger.info("Base epoch has changed. Submitting full change.")
+            else:
+                # an unchanged tree is detected without loading the snapshot tree
+                delta = (
+                    None
+                    if snapshot[2] == tree.digest().hex()
+                    else proposed.diff(self._load_json_objects(snapshot[1]))
+                )
+                if delta is None:
+                    logger.info(
+                        "No changes since last validated snapshot. No need to trigger a pre-change analysis."
+                    )
+                    return
+                logger.info("Submitting changes since last validated snapshot.")
+                proposed = delta
+        # serialize before waiting for a background epoch lookup
+        json_data = str(proposed)
+        logger.debug(f"Proposed change (JSON): {json_data}")
+        result.status = "error"
+        if result.epoch_id is None and (group, site) in self.prefetched:
+            result.error, result.epoch_id = self._get_epoch_id(group, site, deadline)
+            if result.error is not None:
+                return
+        with self._admission_slot(group, site) as waited:
+            result.timings["queue"] = waited
+            deadline += waited
+            if cancel is not None and cancel.is_set():
+                result.status = "cancelled"
+                return
+            start = time.monotonic()
+            result.error, result.job_id = self.ndi.start_pcv(
+                name, group, site, json_data, result.epoch_id, deadline
+            )
+            if result.error is not None:
+                return
+            result.error, result.epoch_job_id = self.ndi.wait_pcv(
+                group, site, str(result.job_id), cancel, deadline
+            )
+            result.timings["analysis"] = time.monotonic() - start
+            if result.error is not None:
+                return
+            if result.epoch_job_id is None:
+                result.status = "cancelled"
+                result.error = self.ndi.delete_pcv(group, site, str(result.job_id))
+                return
+        logger.info(
+            f"Pre-change analysis took {result.timings['analysis']:.0f}s"
+            f" after waiting {result.timings['queue']:.0f}s for a free slot"
+        )
+        writers = list(writers)
+
+        def write_event(event: dict[str, Any]) -> None:
+            for writer in writers:
+                writer.write(event)
+
+        start = time.monotonic()
+        result.error, events = self.ndi.get_pcv_results(
+            group,
+            site,
+            str(result.epoch_job_id),
+            rules,
+            on_event=write_event,
+            details=details,
+            deadline=deadline,
+        )
+        result.timings["results"] = time.monotonic() - start
+        if result.error is not None:
+            return
+        result.events = events or []
+        result.error, result.url = self.ndi.get_pcv_url()
+        if result.error is not None:
+            return
+        result.status = "passed" if rules.passed(result.events) else "failed"
+        if store is not None and not result.events:
+            store.save(group, site, str(result.epoch_id), tree)
+
     def ndi_pcv(
         self,
         name: str,
         group: str,
         site: str,
-        suppress_events: str,
-        file_summary: str,
+        suppress_events: str | RuleSet,
+        file_summary: str | list[str],
         file_url: str,
+        incremental_state: str = "",
+        details: bool = False,
+        cancel: threading.Event | None = None,
     ) -> tuple[httpx.Response | None, list[Any] | None, str | None]:
         """Trigger an NDI pre-change validation"""
-        if not len(self.root.children):
-            logger.info("No updates planned. No need to trigger a pre-change analysis.")
+        if isinstance(file_summary, str):
+            file_summary = [file_summary] if file_summary else []
+        with contextlib.ExitStack() as stack:
+            yaml_writer, writers = self._open_event_writers(stack, file_summary)
+            result = self.validate(
+                name,
+                group,
+                site,
+                suppress_events,
+                incremental_state,
+                details,
+                writers,
+                cancel,
+            )
+        if result.error is not None:
+            return result.error, None, None
+        if result.status == "timeout":
+            raise TimeoutError("Pre-change validation did not complete in time")
+        if result.status in ("skipped", "cancelled"):
             return None, None, None
-        logger.debug(f"Proposed change (JSON): {self.root[0]}")
-        err, job_id = self.ndi.start_pcv(name, group, site, str(self.root[0]))
-        if err is not None:
-            return err, None, None
-        err, epoch_job_id = self.ndi.wait_pcv(group, site, str(job_id))
-        if err is not None:
-            return err, None, None
-        err, events = self.ndi.get_pcv_results(
-            group, site, str(epoch_job_id), suppress_events
-        )
-        if err is not None:
-            return err, None, None
-        err, url = self.ndi.get_pcv_url()
-        if err is not None:
-            return err, None, None
-        if file_summary and events:
-            self._write_pcv_events(events, file_summary)
-        if file_url and url is not None:
-            self._write_pcv_url(url, file_url)
-        return None, events, url
+        if result.events:
+            logger.error(
+                f"The following anomalies have been raised:\n{yaml_writer.getvalue()}"
+            )
+        if file_url and result.url is not None:
+            self._write_pcv_url(result.url, file_url)
+        return None, result.events, result.url
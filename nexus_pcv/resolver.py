@@ -0,0 +1,170 @@
+# Copyright: (c) 2022, Daniel Schmidt <danischm@cisco.com>
+
+import functools
+import logging
+import sqlite3
+import threading
+from collections.abc import Iterator
+
+from .apic import ApicObject
+from .dn import parse_dn, split_rn
+
+logger = logging.getLogger(__name__)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS dn_patterns (
+    pattern TEXT PRIMARY KEY,
+    class TEXT
+);
+CREATE TABLE IF NOT EXISTS rn_prefixes (
+    prefix TEXT PRIMARY KEY,
+    class TEXT,
+    key_attribute TEXT
+);
+"""
+
+# Conflicting observations mark a pattern or prefix as ambiguous (NULL class),
+# observations without key attribute keep the known key attribute
+UPSERT_PATTERN = """
+INSERT INTO dn_patterns (pattern, class) VALUES (?, ?)
+ON CONFLICT (pattern) DO UPDATE SET
+    class = CASE WHEN class = excluded.class THEN class ELSE NULL END
+"""
+UPSERT_PREFIX = """
+INSERT INTO rn_prefixes (prefix, class, key_attribute) VALUES (?, ?, ?)
+ON CONFLICT (prefix) DO UPDATE SET
+    class = CASE WHEN class = excluded.class THEN class ELSE NULL END,
+    key_attribute = CASE
+        WHEN excluded.key_attribute IS NULL THEN key_attribute
+        WHEN key_attribute IS NULL THEN excluded.key_attribute
+        WHEN key_attribute = excluded.key_attribute THEN key_attribute
+        ELSE NULL
+    END
+"""
+
+
+def _split_rn(rn: str) -> tuple[str, str | None]:
+    """Helper function to split RN into prefix and naming value without brackets"""
+    prefix, value = split_rn(rn)
+    if value is not None and value.startswith("[") and value.endswith("]"):
+        value = value[1:-1]
+    return prefix, value
+
+
+def _dn_pattern(rns: tuple[str, ...]) -> str:
+    """Helper function to return DN pattern consisting of RN prefixes, e.g. `uni/tn/ap`"""
+    return "/".join(split_rn(rn)[0] for rn in rns)
+
+
+class ResolverStore:
+    """Persistent store of classnames and key attributes learned from loaded objects
+
+    DN patterns (RN prefixes of all levels) and RN prefixes are mapped to
+    classnames, RN prefixes also to the attribute holding the naming value.
+    Lookups are cached in memory. The store can be shared between threads,
+    database access is serialized.
+    """
+
+    def __init__(self, filename: str, cache_size: int = 4096):
+        try:
+            self.connection = sqlite3.connect(filename, check_same_thread=False)
+            self.connection.executescript(SCHEMA)
+        except sqlite3.Error as e:
+            logger.error(f"Failed to open resolver database: {filename}")
+            raise RuntimeError(
+                f"Failed to open resolver database '{filename}': {e}"
+            ) from e
+        self.lock = threading.Lock()
+        self._lookup_pattern = functools.lru_cache(maxsize=cache_size)(
+            self._query_pattern
+        )
+        self._lookup_prefix = functools.lru_cache(maxsize=cache_size)(
+            self._query_prefix
+        )
+
+    def close(self) -> None:
+        """Close database connection"""
+        with self.lock:
+            self.connection.close()
+
+    def _query_pattern(self, pattern: str) -> str | None:
+        """Helper function to query classname of DN pattern"""
+        with self.lock:
+            row = self.connection.execute(
+                "SELECT class FROM dn_patterns WHERE pattern = ?", (pattern,)
+            ).fetchone()
+        return row[0] if row is not None else None
+
+    def _query_prefix(self, prefix: str) -> tuple[str | None, str | None]:
+        """Helper function to query classname and key attribute of RN prefix"""
+        with self.lock:
+            row = self.connection.execute(
+                "SELECT class, key_attribute FROM rn_prefixes WHERE prefix = ?",
+                (prefix,),
+            ).fetchone()
+        return (row[0], row[1]) if row is not None else (None, None)
+
+    def _observations(
+        self, root: ApicObject
+    ) -> Iterator[tuple[str, str, str, str | None]]:
+        """Helper function to yield DN pattern, RN prefix, classname and key attribute of objects with classname"""
+        dn = root.attributes.get("dn")
+        if root.cl is not None and root.cl != "root" and dn:
+            rns = parse_dn(dn)
+            prefix, value = _split_rn(rns[-1])
+            key_attribute = None
+            if value is not None:
+                if root.attributes.get("name") == value:
+                    key_attribute = "name"
+                else:
+                    key_attribute = next(
+                        (
+                            k
+                            for k, v in root.attributes.items()
+                            if k != "dn" and v == value
+                        ),
+                        None,
+                    )
+            yield _dn_pattern(rns), prefix, root.cl, key_attribute
+        for child in root.children:
+            yield from self._observations(child)
+
+    def learn(self, root: ApicObject) -> None:
+        """Record classnames and key attributes of all objects with classname in tree"""
+        observations = set(self._observations(root))
+        if not observations:
+            return
+        with self.lock, self.connection:
+            self.connection.executemany(
+                UPSERT_PATTERN, {(o[0], o[2]) for o in observations}
+            )
+            self.connection.executemany(
+                UPSERT_PREFIX, {(o[1], o[2], o[3]) for o in observations}
+            )
+            self._lookup_pattern.cache_clear()
+            self._lookup_prefix.cache_clear()
+        logger.debug(f"Learned {len(observations)} classname mapping(s)")
+
+    def resolve(self, root: ApicObject) -> None:
+        """Resolve missing classnames and key attributes in tree"""
+        if root.cl is None:
+            dn = str(root["dn"])
+            rns = parse_dn(dn)
+            prefix, value = _split_rn(rns[-1])
+            cl = self._lookup_pattern(_dn_pattern(rns))
+            prefix_cl, key_attribute = self._lookup_prefix(prefix)
+            if cl is None:
+                cl = prefix_cl
+            if cl is not None:
+                logger.debug(f"Resolving classname from resolver database for '{dn}'")
+                root.cl = cl
+                root.invalidate()
+                if (
+                    cl == prefix_cl
+                    and key_attribute is not None
+                    and value is not None
+                    and key_attribute not in root.attributes
+                ):
+                    root.attributes[key_attribute] = value
+        for child in root.children:
+            self.resolve(child)
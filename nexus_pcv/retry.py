@@ -0,0 +1,109 @@
+# Copyright: (c) 2022, Daniel Schmidt <danischm@cisco.com>
+
+import logging
+import random
+import threading
+import time
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+
+import httpx
+
+logger = logging.getLogger(__name__)
+
+# Responses indicating a transient failure
+RETRY_STATUS_CODES = {429, 502, 503, 504}
+
+
+class RetryPolicy:
+    """Retry policy with exponential backoff and full jitter
+
+    A request is attempted at most `max_attempts` times and retried for at
+    most `budget` seconds in total.
+    """
+
+    def __init__(
+        self,
+        max_attempts: int = 5,
+        backoff: float = 1.0,
+        max_backoff: float = 30.0,
+        budget: float = 120.0,
+    ):
+        self.max_attempts = max(max_attempts, 1)
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.budget = budget
+
+    def delay(self, attempt: int, resp: httpx.Response | None = None) -> float:
+        """Return delay in seconds before the next attempt, honoring Retry-After"""
+        if resp is not None and resp.status_code == 429:
+            retry_after = _retry_after(resp)
+            if retry_after is not None:
+                return retry_after
+        cap = min(self.max_backoff, self.backoff * 2**attempt)
+        return random.uniform(0, cap)  # nosec B311
+
+
+def _retry_after(resp: httpx.Response) -> float | None:
+    """Helper function to parse Retry-After header (seconds or HTTP date)"""
+    value = resp.headers.get("Retry-After")
+    if value is None:
+        return None
+    try:
+        return max(float(value), 0.0)
+    except ValueError:
+        pass
+    try:
+        date = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    return max((date - datetime.now(timezone.utc)).total_seconds(), 0.0)
+
+
+class CircuitBreaker:
+    """Fail fast after consecutive failures until `reset_timeout` seconds have passed
+
+    After the reset timeout a single trial request is let through, closing
+    the circuit again if it succeeds.
+    """
+
+    def __init__(self, failure_threshold: int = 5, reset_timeout: float = 30.0):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.failures = 0
+        self.opened: float | None = None
+        self.lock = threading.Lock()
+
+    def allow(self) -> bool:
+        """Return whether a request may be sent"""
+        with self.lock:
+            if self.opened is None:
+                return True
+            if time.monotonic() - self.opened >= self.reset_timeout:
+                # half-open, let a single trial request through
+                self.opened = time.monotonic()
+                return True
+            return False
+
+    def success(self) -> None:
+        """Record successful request"""
+        with self.lock:
+            self.failures = 0
+            self.opened = None
+
+    def failure(self) -> None:
+        """Record failed request"""
+        with self.lock:
+            self.failures += 1
+            if self.failures >= self.failure_threshold:
+                if self.opened is None:
+                    logger.error("NDI is not responding, failing fast")
+                self.opened = time.monotonic()
+
+
+def response_text(resp: httpx.Response, limit: int = 1000) -> str:
+    """Return response body for logging, which might not be JSON"""
+    try:
+        return str(resp.json())[:limit]
+    except Exception:
+        return resp.text[:limit] or f"HTTP {resp.status_code}"
@@ -0,0 +1,185 @@
+# Copyright: (c) 2022, Daniel Schmidt <danischm@cisco.com>
+
+import logging
+import re
+from collections.abc import Collection, Iterable
+from typing import Any
+
+import yaml
+
+logger = logging.getLogger(__name__)
+
+# NDI anomaly severities in ascending order
+SEVERITIES = ["info", "warning", "minor", "major", "critical"]
+SEVERITY_LEVELS = {s: i for i, s in enumerate(SEVERITIES)}
+
+RULE_KEYS = {
+    "mnemonic",
+    "mnemonic_regex",
+    "category",
+    "severity",
+    "max_severity",
+    "dn_regex",
+}
+
+
+def _severity_level(severity: Any) -> int:
+    """Helper function to return numeric level of severity, unknown severities rank highest"""
+    return SEVERITY_LEVELS.get(str(severity).lower(), len(SEVERITIES))
+
+
+def _as_set(
+    value: str | Iterable[str] | None, lower: bool = False
+) -> frozenset[str] | None:
+    """Helper function to turn a single value or list of values into a set"""
+    if value is None:
+        return None
+    values = [value] if isinstance(value, str) else [str(v) for v in value]
+    return frozenset(v.lower() for v in values) if lower else frozenset(values)
+
+
+class Rule:
+    """Compiled anomaly match rule, all given conditions must match"""
+
+    def __init__(self, rule: dict[str, Any]):
+        unknown = set(rule) - RULE_KEYS
+        if unknown:
+            raise ValueError(f"Unknown rule attribute(s): {', '.join(sorted(unknown))}")
+        if not rule:
+            raise ValueError("Empty rule")
+        self.mnemonics = _as_set(rule.get("mnemonic"))
+        self.categories = _as_set(rule.get("category"), lower=True)
+        self.severities = _as_set(rule.get("severity"), lower=True)
+        self.max_severity = (
+            _severity_level(rule["max_severity"]) if "max_severity" in rule else None
+        )
+        self.mnemonic_regex = (
+            re.compile(rule["mnemonic_regex"]) if "mnemonic_regex" in rule else None
+        )
+        self.dn_regex = re.compile(rule["dn_regex"]) if "dn_regex" in rule else None
+
+    def match(
+        self, mnemonic: str, category: str, severity: str, dns: Collection[str]
+    ) -> bool:
+        """Return whether anomaly matches all conditions of rule"""
+        if self.mnemonics is not None and mnemonic not in self.mnemonics:
+            return False
+        if self.categories is not None and category not in self.categories:
+            return False
+        if self.severities is not None and severity not in self.severities:
+            return False
+        if (
+            self.max_severity is not None
+            and _severity_level(severity) > self.max_severity
+        ):
+            return False
+        if self.mnemonic_regex is not None and not self.mnemonic_regex.search(mnemonic):
+            return False
+        if self.dn_regex is not None and not any(
+            self.dn_regex.search(dn) for dn in dns
+        ):
+            return False
+        return True
+
+
+class RuleSet:
+    """Anomaly suppression rules and pass/fail gating
+
+    Rules only matching on mnemonics, categories or a maximum severity are
+    merged into set lookups and a single threshold, all other rules are
+    evaluated in order until the first match.
+    """
+
+    def __init__(
+        self,
+        suppress: Iterable[dict[str, Any]] = (),
+        fail_severity: str | None = None,
+        max_events: int = 0,
+    ):
+        self.mnemonics: set[str] = set()
+        self.categories: set[str] = set()
+        self.max_severity = -1
+        self.rules: list[Rule] = []
+        for r in suppress:
+            self.add_rule(r)
+        self.fail_level = (
+            _severity_level(fail_severity) if fail_severity is not None else 0
+        )
+        self.max_events = max_events
+
+    def add_rule(self, rule: dict[str, Any]) -> None:
+        """Compile and add suppression rule"""
+        compiled = Rule(rule)
+        if set(rule) == {"mnemonic"} and compiled.mnemonics is not None:
+            self.mnemonics.update(compiled.mnemonics)
+        elif set(rule) == {"category"} and compiled.categories is not None:
+            self.categories.update(compiled.categories)
+        elif set(rule) == {"max_severity"} and compiled.max_severity is not None:
+            self.max_severity = max(self.max_severity, compiled.max_severity)
+        else:
+            self.rules.append(compiled)
+
+    @classmethod
+    def from_suppress_events(cls, suppress_events: str | Collection[str]) -> "RuleSet":
+        """Create rule set suppressing info events and the given mnemonics"""
+        if isinstance(suppress_events, str):
+            suppress_events = suppress_events.split(",")
+        rules: list[dict[str, Any]] = [{"max_severity": "info"}]
+        mnemonics = [m for m in suppress_events if m]
+        if mnemonics:
+            rules.append({"mnemonic": mnemonics})
+        return cls(rules)
+
+    def load(self, filename: str) -> None:
+        """Load additional suppression rules and gating settings from YAML file
+
+        suppress:
+          - mnemonic: [APP_EPG_NOT_DEPLOYED]
+          - category: compliance
+            max_severity: warning
+          - mnemonic_regex: "^BD_"
+            dn_regex: "^uni/tn-LAB/"
+        fail:
+          severity: major
+          max_events: 0
+        """
+        try:
+            with open(filename) as file:
+                data = yaml.safe_load(file) or {}
+            for rule in data.get("suppress") or []:
+                self.add_rule(rule)
+            fail = data.get("fail") or {}
+            if "severity" in fail:
+                self.fail_level = _severity_level(fail["severity"])
+            self.max_events = int(fail.get("max_events", self.max_events))
+        except Exception as e:
+            logger.error(f"Failed to load rules file: {filename}")
+            raise RuntimeError(f"Failed to load rules file '{filename}': {e}") from e
+
+    def suppressed(self, event: dict[str, Any]) -> bool:
+        """Return whether a raw NDI anomaly event is suppressed"""
+        mnemonic = str(event.get("mnemonicTitle"))
+        if mnemonic in self.mnemonics:
+            return True
+        category = str(event.get("category")).lower()
+        if category in self.categories:
+            return True
+        severity = str(event.get("severity")).lower()
+        if _severity_level(severity) <= self.max_severity:
+            return True
+        if not self.rules:
+            return False
+        dns = event.get("affectedObjects") or []
+        return any(r.match(mnemonic, category, severity, dns) for r in self.rules)
+
+    @property
+    def matches_dns(self) -> bool:
+        """Return whether rules match affected object DNs, requiring event details"""
+        return any(r.dn_regex is not None for r in self.rules)
+
+    def passed(self, events: Iterable[dict[str, Any]]) -> bool:
+        """Return whether reported (not suppressed) events pass the gate"""
+        failing = [
+            e for e in events if _severity_level(e.get("Severity")) >= self.fail_level
+        ]
+        return len(failing) <= self.max_events
@@ -0,0 +1,272 @@
+# Copyright: (c) 2022, Daniel Schmidt <danischm@cisco.com>
+
+import collections
+import http.server
+import logging
+import os
+import socketserver
+import threading
+import time
+import uuid
+from typing import Any
+
+from . import codec
+from .cli.options import DEFAULT_SUPPRESS_EVENTS
+from .ndi import NDI
+from .pcv import PCV
+
+logger = logging.getLogger(__name__)
+
+
+class Job:
+    """Pre-change validation job submitted to the validation service"""
+
+    def __init__(self, request: dict[str, Any]):
+        for key in ("name", "site"):
+            if not isinstance(request.get(key), str) or not request[key]:
+                raise ValueError(f"Missing or invalid field '{key}'")
+        if not request.get("changes") and not request.get("tf_plan"):
+            raise ValueError("Either 'changes' or 'tf_plan' is required")
+        self.id = uuid.uuid4().hex
+        self.name: str = request["name"]
+        self.group: str = request.get("group", "default")
+        self.site: str = request["site"]
+        self.suppress_events: str = request.get(
+            "suppress_events", DEFAULT_SUPPRESS_EVENTS
+        )
+        self.changes: list[dict[str, Any]] = request.get("changes") or []
+        self.tf_plan: dict[str, Any] | None = request.get("tf_plan")
+        self.status = "queued"
+        self.events: list[Any] | None = None
+        self.url: str | None = None
+        self.error: str | None = None
+        self.submitted = time.time()
+        self.started: float | None = None
+        self.finished: float | None = None
+
+    @property
+    def key(self) -> tuple[str, str]:
+        return self.group, self.site
+
+    def to_dict(self) -> dict[str, Any]:
+        """Return JSON serializable job status"""
+        return {
+            "id": self.id,
+            "name": self.name,
+            "group": self.group,
+            "site": self.site,
+            "status": self.status,
+            "events": self.events,
+            "url": self.url,
+            "error": self.error,
+            "submitted": self.submitted,
+            "started": self.started,
+            "finished": self.finished,
+        }
+
+
+class ValidationService:
+    """Queue and run pre-change validations sharing a single authenticated NDI client"""
+
+    def __init__(
+        self,
+        ndi: NDI,
+        workers: int = 8,
+        site_concurrency: int = 1,
+        max_jobs: int = 1000,
+    ):
+        self.ndi = ndi
+        self.workers = workers
+        self.site_concurrency = site_concurrency
+        self.max_jobs = max_jobs
+        self.jobs: collections.OrderedDict[str, Job] = collections.OrderedDict()
+        self.queue: collections.deque[Job] = collections.deque()
+        self.running: collections.Counter[tuple[str, str]] = collections.Counter()
+        self.condition = threading.Condition()
+        self.threads: list[threading.Thread] = []
+        self.stopped = False
+
+    def start(self) -> None:
+        """Start worker threads"""
+        for i in range(self.workers):
+            thread = threading.Thread(
+                target=self._worker, name=f"pcv-worker-{i}", daemon=True
+            )
+            thread.start()
+            self.threads.append(thread)
+
+    def stop(self, wait: bool = True) -> None:
+        """Stop worker threads, optionally waiting for running jobs to complete"""
+        with self.condition:
+            self.stopped = True
+            self.condition.notify_all()
+        if wait:
+            for thread in self.threads:
+                thread.join()
+
+    def submit(self, request: dict[str, Any]) -> Job:
+        """Queue a new pre-change validation job"""
+        job = Job(request)
+        with self.condition:
+            self.jobs[job.id] = job
+            self._expire_jobs()
+            self.queue.append(job)
+            self.condition.notify_all()
+        logger.info(f"Queued job {job.id} for site '{job.site}'")
+        return job
+
+    def get(self, job_id: str) -> Job | None:
+        """Get job by ID"""
+        with self.condition:
+            return self.jobs.get(job_id)
+
+    def _expire_jobs(self) -> None:
+        """Helper function to drop oldest finished jobs exceeding the job limit"""
+        for job_id in list(self.jobs):
+            if len(self.jobs) <= self.max_jobs:
+                break
+            if self.jobs[job_id].finished is not None:
+                del self.jobs[job_id]
+
+    def _next_job(self) -> Job | None:
+        """Helper function to return the oldest queued job of a site with free capacity"""
+        for job in self.queue:
+            if self.running[job.key] < self.site_concurrency:
+                self.queue.remove(job)
+                self.running[job.key] += 1
+                return job
+        return None
+
+    def _worker(self) -> None:
+        """Helper function to run queued jobs until stopped"""
+        while True:
+            with self.condition:
+                job = None
+                while not self.stopped:
+                    job = self._next_job()
+                    if job is not None:
+                        break
+                    self.condition.wait()
+                if job is None:
+                    return
+            try:
+                self._run(job)
+            finally:
+                with self.condition:
+                    self.running[job.key] -= 1
+                    self.condition.notify_all()
+
+    def _run(self, job: Job) -> None:
+        """Helper function to run pre-change validation of a job"""
+        job.status = "running"
+        job.started = time.time()
+        try:
+            pcv = PCV(
+                self.ndi.hostname_ip,
+                self.ndi.username,
+                self.ndi.password,
+                self.ndi.domain,
+                self.ndi.timeout,
+                ndi=self.ndi,
+            )
+            if job.changes:
+                pcv.load_json(job.changes)
+            if job.tf_plan:
+                pcv.load_tf_changes(job.tf_plan.get("resource_changes", []))
+            err, events, url = pcv.ndi_pcv(
+                job.name, job.group, job.site, job.suppress_events, "", ""
+            )
+            if err is not None:
+                job.error = f"NDI request failed ({err.status_code}): {err.text}"
+                job.status = "failed"
+            else:
+                job.events = events or []
+                job.url = url
+                job.status = "completed"
+        except Exception as e:
+            logger.error(f"Job {job.id} failed: {e}")
+            job.error = str(e)
+            job.status = "failed"
+        job.finished = time.time()
+        logger.info(f"Job {job.id} {job.status}")
+
+
+class _RequestHandler(http.server.BaseHTTPRequestHandler):
+    """HTTP API of the validation service"""
+
+    server: "_HTTPServer"
+
+    def _send(self, status: int, body: Any) -> None:
+        data = codec.dumps(body).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def do_GET(self) -> None:
+        service = self.server.service
+        if self.path == "/health":
+            self._send(200, {"status": "ok"})
+        elif self.path.startswith("/jobs/"):
+            job = service.get(self.path[len("/jobs/") :])
+            if job is None:
+                self._send(404, {"error": "Job not found"})
+            else:
+                self._send(200, job.to_dict())
+        else:
+            self._send(404, {"error": "Not found"})
+
+    def do_POST(self) -> None:
+        if self.path != "/jobs":
+            self._send(404, {"error": "Not found"})
+            return
+        try:
+            length = int(self.headers.get("Content-Length", 0))
+            request = codec.loads(self.rfile.read(length))
+            if not isinstance(request, dict):
+                raise ValueError("Request body must be a JSON object")
+            job = self.server.service.submit(request)
+        except ValueError as e:
+            self._send(400, {"error": str(e)})
+            return
+        self._send(202, {"id": job.id, "status": job.status})
+
+    def log_message(self, format: str, *args: Any) -> None:
+        logger.debug(format % args)
+
+
+class _HTTPServer(http.server.ThreadingHTTPServer):
+    service: ValidationService
+
+
+class _UnixHTTPServer(socketserver.ThreadingUnixStreamServer):
+    service: ValidationService
+    daemon_threads = True
+
+
+def serve(
+    service: ValidationService,
+    host: str = "127.0.0.1",
+    port: int = 8080,
+    socket_path: str = "",
+) -> None:
+    """Serve HTTP API of validation service on TCP port or Unix socket until interrupted"""
+    server: socketserver.BaseServer
+    if socket_path:
+        if os.path.exists(socket_path):
+            os.unlink(socket_path)
+        server = _UnixHTTPServer(socket_path, _RequestHandler)
+        logger.warning(f"Validation service listening on unix:{socket_path}")
+    else:
+        server = _HTTPServer((host, port), _RequestHandler)
+        logger.warning(f"Validation service listening on http://{host}:{port}")
+    server.service = service  # type: ignore[attr-defined]
+    service.start()
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        service.stop(wait=False)
@@ -0,0 +1,67 @@
+# Copyright: (c) 2022, Daniel Schmidt <danischm@cisco.com>
+
+import json
+import logging
+import os
+import re
+import tempfile
+from pathlib import Path
+from typing import Any
+
+from . import codec
+from .apic import ApicObject
+
+logger = logging.getLogger(__name__)
+
+
+class SnapshotStore:
+    """Persist the last successfully validated object tree per insights group and site"""
+
+    def __init__(self, directory: str):
+        self.directory = Path(directory)
+
+    def _path(self, group: str, site: str) -> Path:
+        """Helper function to return snapshot file path of insights group and site"""
+        name = re.sub(r"[^A-Za-z0-9_.-]", "_", f"{group}__{site}")
+        return self.directory / f"{name}.json"
+
+    def load(
+        self, group: str, site: str
+    ) -> tuple[str, dict[str, Any], str | None] | None:
+        """Load base epoch ID, object tree and hash of object tree of last validated change"""
+        path = self._path(group, site)
+        try:
+            with open(path, "rb") as file:
+                snapshot = codec.loads(file.read())
+        except FileNotFoundError:
+            return None
+        except Exception as e:
+            logger.warning(f"Ignoring invalid snapshot file '{path}': {e}")
+            return None
+        if snapshot.get("group") != group or snapshot.get("site") != site:
+            return None
+        return str(snapshot["epoch_id"]), snapshot["tree"], snapshot.get("digest")
+
+    def save(self, group: str, site: str, epoch_id: str, tree: ApicObject) -> None:
+        """Save base epoch ID and object tree of validated change"""
+        snapshot = {
+            "group": group,
+            "site": site,
+            "epoch_id": epoch_id,
+            "tree": codec.loads(str(tree)),
+            "digest": tree.digest().hex(),
+        }
+        self.directory.mkdir(parents=True, exist_ok=True)
+        path = self._path(group, site)
+        # unique temporary file as snapshots might be saved concurrently
+        with tempfile.NamedTemporaryFile(
+            "w", dir=self.directory, prefix=f"{path.stem}.", suffix=".tmp", delete=False
+        ) as file:
+            try:
+                json.dump(snapshot, file, sort_keys=True)
+            except BaseException:
+                file.close()
+                os.unlink(file.name)
+                raise
+        os.replace(file.name, path)
+        logger.debug(f"Saved snapshot of validated change to '{path}'")
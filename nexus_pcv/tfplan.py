@@ -0,0 +1,169 @@
+# Copyright: (c) 2022, Daniel Schmidt <danischm@cisco.com>
+
+import json
+import logging
+import re
+from collections.abc import Collection, Iterator
+from typing import IO, Any
+
+logger = logging.getLogger(__name__)
+
+_WHITESPACE_REGEX = re.compile(r"\s*")
+_NUMBER_CHARS = frozenset("0123456789.eE+-")
+
+
+class _PlanReader:
+    """Incremental reader of a JSON document keeping only the current value in memory"""
+
+    _decoder = json.JSONDecoder()
+
+    def __init__(self, file: IO[str], chunk_size: int):
+        self.file = file
+        self.chunk_size = chunk_size
+        self.buf = ""
+        self.pos = 0
+        self.eof = False
+
+    def _fill(self) -> bool:
+        """Helper function to discard consumed buffer content and read next chunk"""
+        if self.pos:
+            self.buf = self.buf[self.pos :]
+            self.pos = 0
+        if self.eof:
+            return False
+        chunk = self.file.read(self.chunk_size)
+        if not chunk:
+            self.eof = True
+            return False
+        self.buf += chunk
+        return True
+
+    def _skip_whitespace(self) -> str:
+        """Helper function to skip whitespace and return next character"""
+        while True:
+            self.pos = _WHITESPACE_REGEX.match(self.buf, self.pos).end()  # type: ignore[union-attr]
+            if self.pos < len(self.buf):
+                return self.buf[self.pos]
+            if not self._fill():
+                raise ValueError("Unexpected end of JSON document")
+
+    def _expect(self, char: str) -> None:
+        """Helper function to consume expected character"""
+        if self._skip_whitespace() != char:
+            raise ValueError(f"Expected '{char}' at position {self.pos}")
+        self.pos += 1
+
+    def _try_decode(self) -> tuple[bool, Any]:
+        """Helper function to decode value at current position if completely buffered"""
+        try:
+            obj, end = self._decoder.raw_decode(self.buf, self.pos)
+        except json.JSONDecodeError:
+            if self.eof:
+                raise
+            return False, None
+        # a number at the end of the buffer might continue in the next chunk
+        if not self.eof and (end == len(self.buf) or self.buf[end] in _NUMBER_CHARS):
+            return False, None
+        self.pos = end
+        return True, obj
+
+    def _read_value(self) -> Any:
+        """Helper function to consume and decode next value"""
+        self._skip_whitespace()
+        while True:
+            ok, obj = self._try_decode()
+            if ok:
+                return obj
+            self._fill()
+
+    def _skip_value(self) -> None:
+        """Helper function to consume next value without keeping it in memory
+
+        Values larger than a chunk are descended into, so that only their
+        members are decoded (and immediately discarded) one at a time.
+        """
+        stack: list[str] = []
+        need_key = False
+        while True:
+            char = self._skip_whitespace()
+            if stack:
+                if char == stack[-1]:
+                    self.pos += 1
+                    stack.pop()
+                    if not stack:
+                        return
+                    continue
+                if char == ",":
+                    self.pos += 1
+                    need_key = stack[-1] == "}"
+                    continue
+                if need_key:
+                    self._read_value()
+                    self._expect(":")
+                    need_key = False
+                    char = self._skip_whitespace()
+            ok, _ = self._try_decode()
+            if ok:
+                if not stack:
+                    return
+            elif char in "[{" and len(self.buf) - self.pos >= self.chunk_size:
+                stack.append("]" if char == "[" else "}")
+                need_key = char == "{"
+                self.pos += 1
+            else:
+                self._fill()
+
+    def iter_items(self, key: str) -> Iterator[Any]:
+        """Yield array items of top-level key, skipping all other values"""
+        self._expect("{")
+        while True:
+            char = self._skip_whitespace()
+            if char == "}":
+                return
+            if char == ",":
+                self.pos += 1
+                continue
+            name = self._read_value()
+            self._expect(":")
+            if name != key:
+                self._skip_value()
+                continue
+            self._expect("[")
+            while True:
+                char = self._skip_whitespace()
+                if char == "]":
+                    self.pos += 1
+                    break
+                if char == ",":
+                    self.pos += 1
+                    continue
+                yield self._read_value()
+
+
+def iter_resource_changes(
+    file: IO[str],
+    types: Collection[str] | None = None,
+    actions: Collection[str] | None = None,
+    chunk_size: int = 1 << 20,
+) -> Iterator[dict[str, Any]]:
+    """Stream resource changes from Terraform plan JSON, optionally filtered by type and action"""
+    reader = _PlanReader(file, chunk_size)
+    for change in reader.iter_items("resource_changes"):
+        if types is not None and change.get("type") not in types:
+            continue
+        if actions is not None and not any(
+            a in actions for a in change.get("change", {}).get("actions", [])
+        ):
+            continue
+        yield change
+
+
+def read_resource_changes(
+    filename: str, types: Collection[str] | None = None
+) -> list[dict[str, Any]]:
+    """Read resource changes of Terraform plan file, optionally filtered by type
+
+    Runs in worker processes to parse several plans concurrently.
+    """
+    with open(filename) as file:
+        return list(iter_resource_changes(file, types=types))
@@ -0,0 +1,136 @@
+# Copyright: (c) 2022, Daniel Schmidt <danischm@cisco.com>
+
+import logging
+import os
+import threading
+import time
+from collections.abc import Callable
+
+from .cache import InventoryCache
+from .pcv import PCV
+
+logger = logging.getLogger(__name__)
+
+
+def _stat(filename: str) -> tuple[int, int] | None:
+    """Helper function to return modification time and size of file, None if missing"""
+    try:
+        st = os.stat(filename)
+    except OSError:
+        return None
+    return st.st_mtime_ns, st.st_size
+
+
+class FileWatcher:
+    """Detect modified files by polling their modification time and size"""
+
+    def __init__(
+        self, filenames: list[str], poll_interval: float = 0.5, debounce: float = 1.0
+    ):
+        self.poll_interval = poll_interval
+        self.debounce = debounce
+        self.stats = {f: _stat(f) for f in filenames}
+
+    def _modified(self) -> set[str]:
+        """Helper function to return files modified since the last poll"""
+        modified = set()
+        for filename, stat in self.stats.items():
+            current = _stat(filename)
+            if current != stat:
+                self.stats[filename] = current
+                modified.add(filename)
+        return modified
+
+    def wait(self, stop: threading.Event) -> set[str]:
+        """Wait for modified files, returning them once no file has been modified for `debounce` seconds
+
+        Returns an empty set if stopped.
+        """
+        modified: set[str] = set()
+        last = 0.0
+        while not stop.wait(self.poll_interval):
+            changed = self._modified()
+            if changed:
+                modified |= changed
+                last = time.monotonic()
+            elif (
+                modified
+                and time.monotonic() - last >= self.debounce
+                # files being rewritten might be missing or empty for a moment
+                and all(self.stats[f] for f in modified)
+            ):
+                return modified
+        return set()
+
+
+class Watcher:
+    """Validate changes again whenever input files are modified
+
+    The NDI session and the objects of unmodified inputs are reused. A
+    validation still running when inputs are modified is cancelled.
+    """
+
+    def __init__(
+        self,
+        pcv: PCV,
+        filenames: list[str],
+        tf_plans: list[str],
+        validate: Callable[[threading.Event], object],
+        cache: InventoryCache | None = None,
+        poll_interval: float = 0.5,
+        debounce: float = 1.0,
+    ):
+        self.pcv = pcv
+        self.cache = cache
+        self.filenames = filenames
+        self.tf_plans = tf_plans
+        self.validate = validate
+        self.files = FileWatcher([*filenames, *tf_plans], poll_interval, debounce)
+
+    def _start(
+        self, modified: set[str] | None
+    ) -> tuple[threading.Thread, threading.Event] | None:
+        """Helper function to reload inputs and start validation in the background"""
+        try:
+            self.pcv.load_inputs(self.filenames, self.tf_plans, modified, self.cache)
+        except Exception as e:
+            logger.error(f"Error during execution: {e}")
+            return None
+        cancel = threading.Event()
+        thread = threading.Thread(
+            target=self._run, args=(cancel,), name="pcv-watch", daemon=True
+        )
+        thread.start()
+        return thread, cancel
+
+    def _run(self, cancel: threading.Event) -> None:
+        """Helper function to run validation, logging errors"""
+        try:
+            self.validate(cancel)
+        except Exception as e:
+            logger.error(f"Error during execution: {e}")
+        if not cancel.is_set():
+            logger.info("Waiting for input files to be modified ...")
+
+    def run(self, stop: threading.Event | None = None) -> None:
+        """Validate changes until stopped or interrupted"""
+        stop = stop if stop is not None else threading.Event()
+        running = self._start(None)
+        try:
+            while not stop.is_set():
+                modified = self.files.wait(stop)
+                if not modified:
+                    continue
+                logger.info(f"Input files modified: {', '.join(sorted(modified))}")
+                if running is not None and running[0].is_alive():
+                    logger.info("Cancelling stale pre-change validation")
+                    running[1].set()
+                    running[0].join()
+                running = self._start(modified)
+        except KeyboardInterrupt:
+            pass
+        finally:
+            # delete a running analysis also if terminated
+            if running is not None and running[0].is_alive():
+                running[1].set()
+                running[0].join()
@@ -0,0 +1,253 @@
+# Copyright: (c) 2022, Daniel Schmidt <danischm@cisco.com>
+
+import abc
+import io
+import logging
+from types import TracebackType
+from typing import IO, Any
+from xml.sax.saxutils import escape, quoteattr  # nosec B406
+
+import yaml
+
+from . import codec
+
+logger = logging.getLogger(__name__)
+
+# Use the C-accelerated YAML emitter if available
+YamlDumper = getattr(yaml, "CSafeDumper", yaml.SafeDumper)
+
+SARIF_LEVELS = {
+    "critical": "error",
+    "major": "error",
+    "minor": "warning",
+    "warning": "warning",
+    "info": "note",
+}
+
+
+def _is_plain(data: Any) -> bool:
+    """Helper function to return whether all strings of data are printable ASCII without line breaks"""
+    if isinstance(data, str):
+        return data.isascii() and data.isprintable()
+    if isinstance(data, dict):
+        return all(_is_plain(k) and _is_plain(v) for k, v in data.items())
+    if isinstance(data, list):
+        return all(_is_plain(v) for v in data)
+    return True
+
+
+def dump_yaml(data: Any) -> str:
+    """Serialize data to YAML, identical to `yaml.dump(data, default_flow_style=False)`
+
+    The C emitter folds and escapes non-ASCII and multi-line strings
+    differently, such data is serialized by the Python emitter.
+    """
+    dumper = YamlDumper if _is_plain(data) else yaml.SafeDumper
+    return str(yaml.dump(data, Dumper=dumper, default_flow_style=False))
+
+
+class EventWriter(abc.ABC):
+    """Base class of writers streaming pre-change validation events to a file
+
+    If the validation did not complete, `fail()` has to be called before
+    closing the writer to not report the written events as complete result.
+    Leaving the context because of an exception fails the writer as well.
+    """
+
+    # whether the file is created if no events have been written
+    create_empty = True
+
+    def __init__(self, filename: str):
+        self.filename = filename
+        self.file: IO[str] | None = None
+        self.count = 0
+        self.error: str | None = None
+
+    def _open(self) -> IO[str]:
+        """Helper function to open file and write header"""
+        if self.file is None:
+            self.file = open(self.filename, "w")
+            self._write_header(self.file)
+        return self.file
+
+    @abc.abstractmethod
+    def _write_header(self, file: IO[str]) -> None:
+        """Helper function to write header"""
+
+    @abc.abstractmethod
+    def _write_footer(self, file: IO[str]) -> None:
+        """Helper function to write footer, reporting `error` if set"""
+
+    @abc.abstractmethod
+    def _write_event(self, file: IO[str], event: dict[str, Any]) -> None:
+        """Helper function to write event"""
+
+    def write(self, event: dict[str, Any]) -> None:
+        """Write event to file"""
+        file = self._open()
+        self._write_event(file, event)
+        self.count += 1
+        file.flush()
+
+    def fail(self, message: str) -> None:
+        """Mark validation as failed, the footer reports the error instead of the result"""
+        if self.error is None:
+            self.error = message
+
+    def close(self) -> None:
+        """Write footer and close file"""
+        if self.file is None and not self.create_empty:
+            return
+        file = self._open()
+        self._write_footer(file)
+        file.close()
+
+    def __enter__(self) -> "EventWriter":
+        return self
+
+    def __exit__(
+        self,
+        exc_type: type[BaseException] | None,
+        exc_value: BaseException | None,
+        traceback: TracebackType | None,
+    ) -> None:
+        if exc_type is not None:
+            self.fail(str(exc_value) or exc_type.__name__)
+        self.close()
+
+
+class YamlEventWriter(EventWriter):
+    """Write events as YAML list, the file is only created if there are events
+
+    The rendered YAML is kept to be reused (e.g. for logging) without
+    serializing the events again.
+    """
+
+    create_empty = False
+
+    def __init__(self, filename: str | None):
+        super().__init__(filename or "")
+        self.chunks: list[str] = []
+
+    def _open(self) -> IO[str]:
+        if self.file is None and not self.filename:
+            # no summary file, events are only kept
+            self.file = io.StringIO()
+        return super()._open()
+
+    def _write_header(self, file: IO[str]) -> None:
+        pass
+
+    def _write_event(self, file: IO[str], event: dict[str, Any]) -> None:
+        chunk = dump_yaml([event])
+        self.chunks.append(chunk)
+        file.write(chunk)
+
+    def _write_footer(self, file: IO[str]) -> None:
+        pass
+
+    def getvalue(self) -> str:
+        """Return YAML of all written events"""
+        return "".join(self.chunks)
+
+
+class JsonLinesEventWriter(EventWriter):
+    """Write events as JSON Lines, followed by an error record if failed"""
+
+    def _write_header(self, file: IO[str]) -> None:
+        pass
+
+    def _write_event(self, file: IO[str], event: dict[str, Any]) -> None:
+        file.write(codec.dumps(event) + "\n")
+
+    def _write_footer(self, file: IO[str]) -> None:
+        if self.error is not None:
+            file.write(codec.dumps({"Error": self.error}) + "\n")
+
+
+class JUnitEventWriter(EventWriter):
+    """Write events as JUnit XML, each event being a failed test case"""
+
+    def _write_header(self, file: IO[str]) -> None:
+        file.write(
+            '<?xml version="1.0" encoding="UTF-8"?>\n'
+            '<testsuites name="nexus-pcv">\n'
+            '  <testsuite name="Pre-Change Validation">\n'
+        )
+
+    def _write_event(self, file: IO[str], event: dict[str, Any]) -> None:
+        name = quoteattr(str(event.get("Description")))
+        classname = quoteattr(f"nexus-pcv.{event.get('Category')}")
+        message = quoteattr(
+            f"{event.get('Severity')} anomaly raised {event.get('Count')} time(s)"
+        )
+        details = "\n".join(event.get("Affected Objects") or [])
+        file.write(
+            f"    <testcase classname={classname} name={name}>\n"
+            f"      <failure message={message} type={quoteattr(str(event.get('Severity')))}>"
+            f"{escape(details)}</failure>\n"
+            "    </testcase>\n"
+        )
+
+    def _write_footer(self, file: IO[str]) -> None:
+        if self.error is not None:
+            file.write(
+                '    <testcase classname="nexus-pcv" name="Pre-change validation">\n'
+                f'      <error message={quoteattr(self.error)} type="error"/>\n'
+                "    </testcase>\n"
+            )
+        elif self.count == 0:
+            file.write(
+                '    <testcase classname="nexus-pcv" name="No anomalies raised"/>\n'
+            )
+        file.write("  </testsuite>\n</testsuites>\n")
+
+
+class SarifEventWriter(EventWriter):
+    """Write events as SARIF 2.1.0 log"""
+
+    def _write_header(self, file: IO[str]) -> None:
+        file.write(
+            '{"$schema": "https://json.schemastore.org/sarif-2.1.0.json", '
+            '"version": "2.1.0", "runs": [{"tool": {"driver": {"name": "nexus-pcv", '
+            '"informationUri": "https://github.com/netascode/nexus-pcv"}}, '
+            '"results": ['
+        )
+
+    def _write_event(self, file: IO[str], event: dict[str, Any]) -> None:
+        result: dict[str, Any] = {
+            "ruleId": str(event.get("Category")),
+            "level": SARIF_LEVELS.get(str(event.get("Severity")).lower(), "error"),
+            "message": {"text": str(event.get("Description"))},
+            "properties": {
+                "severity": event.get("Severity"),
+                "count": event.get("Count"),
+            },
+        }
+        if event.get("Affected Objects"):
+            result["locations"] = [
+                {"logicalLocations": [{"fullyQualifiedName": dn}]}
+                for dn in event["Affected Objects"]
+            ]
+        separator = ", " if self.count else ""
+        file.write(separator + codec.dumps(result))
+
+    def _write_footer(self, file: IO[str]) -> None:
+        invocation: dict[str, Any] = {"executionSuccessful": self.error is None}
+        if self.error is not None:
+            invocation["toolExecutionNotifications"] = [
+                {"level": "error", "message": {"text": self.error}}
+            ]
+        file.write(f'], "invocations": [{codec.dumps(invocation)}]}}]}}\n')
+
+
+def create_event_writer(filename: str) -> EventWriter:
+    """Create event writer according to file extension (.jsonl, .xml, .sarif or YAML)"""
+    name = filename.lower()
+    if name.endswith((".jsonl", ".ndjson")):
+        return JsonLinesEventWriter(filename)
+    if name.endswith(".xml"):
+        return JUnitEventWriter(filename)
+    if name.endswith((".sarif", ".sarif.json")):
+        return SarifEventWriter(filename)
+    return YamlEventWriter(filename)
@@ -0,0 +1,61 @@
+# Copyright: (c) 2022, Daniel Schmidt <danischm@cisco.com>
+
+"""Benchmark JSON load and serialize hot paths on a large synthetic fabric.
+
+Usage: python tests/benchmarks/bench_codec.py [tenants]
+"""
+
+import json
+import sys
+import timeit
+
+from nexus_pcv import codec
+from nexus_pcv.apic import ApicObject
+
+
+def build_fabric(tenants: int) -> ApicObject:
+    uni = ApicObject("polUni", {"dn": "uni"}, [], None)
+    for t in range(tenants):
+        tn = uni.add_child("fvTenant", {"dn": f"uni/tn-T{t}", "name": f"T{t}"}, [])
+        for a in range(10):
+            ap = tn.add_child("fvAp", {"name": f"AP{a}", "descr": "Application"}, [])
+            for e in range(20):
+                epg = ap.add_child(
+                    "fvAEPg",
+                    {"name": f"EPG{e}", "prefGrMemb": "exclude", "descr": "EPG"},
+                    [],
+                )
+                epg.add_child("fvRsBd", {"tnFvBDName": f"BD{e}"}, [])
+    return uni
+
+
+def legacy_str(obj: ApicObject) -> str:
+    attr_string = ", ".join(
+        [f'"{k}": {json.dumps(v)}' for k, v in obj.attributes.items()]
+    )
+    child_string = ", ".join([legacy_str(c) for c in obj.children])
+    return f'{{"{obj.cl}": {{"attributes": {{{attr_string}}}, "children": [{child_string}]}}}}'
+
+
+def bench(label: str, func: object, number: int = 3) -> float:
+    seconds = min(timeit.repeat(func, number=1, repeat=number))  # type: ignore[arg-type]
+    print(f"{label:<32} {seconds * 1000:8.1f} ms")
+    return seconds
+
+
+def main() -> None:
+    tenants = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+    fabric = build_fabric(tenants)
+    data = str(fabric).encode()
+    assert str(fabric) == legacy_str(fabric)
+    print(f"JSON backend: {codec.BACKEND}, document size: {len(data) / 1e6:.1f} MB")
+    base = bench("load (json.loads)", lambda: json.loads(data))
+    fast = bench("load (codec.loads)", lambda: codec.loads(data))
+    print(f"{'speedup':<32} {base / fast:8.2f} x")
+    base = bench("serialize (legacy)", lambda: legacy_str(fabric))
+    fast = bench("serialize (ApicObject.__str__)", lambda: str(fabric))
+    print(f"{'speedup':<32} {base / fast:8.2f} x")
+
+
+if __name__ == "__main__":
+    main()
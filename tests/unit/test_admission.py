@@ -0,0 +1,67 @@
+# Copyright: (c) 2022, Daniel Schmidt <danischm@cisco.com>
+
+import contextlib
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Any
+
+import pytest
+
+from nexus_pcv.admission import AdmissionController
+
+pytestmark = pytest.mark.unit
+
+
+def controller(path: Path, **kwargs: Any) -> AdmissionController:
+    return AdmissionController(str(path / "admission.db"), poll_interval=0.01, **kwargs)
+
+
+def queued(path: Path) -> int:
+    with contextlib.closing(sqlite3.connect(path / "admission.db")) as connection:
+        return int(connection.execute("SELECT COUNT(*) FROM tickets").fetchone()[0])
+
+
+def test_fifo(tmp_path: Path) -> None:
+    order: list[int] = []
+    first = controller(tmp_path)
+    ticket, waited = first.acquire("ndi/group1/site1")
+    assert waited < 1
+
+    def run(i: int) -> None:
+        with controller(tmp_path).slot("ndi/group1/site1"):
+            order.append(i)
+
+    threads = []
+    for i in range(3):
+        thread = threading.Thread(target=run, args=(i,))
+        thread.start()
+        threads.append(thread)
+        # wait for the ticket to be queued to make the order deterministic
+        while queued(tmp_path) < i + 2:
+            time.sleep(0.01)
+    # other keys are admitted independently
+    with first.slot("ndi/group1/site2") as waited:
+        assert waited < 1
+    assert order == []
+    first.release(ticket)
+    for thread in threads:
+        thread.join(5)
+    assert order == [0, 1, 2]
+
+
+def test_max_concurrent(tmp_path: Path) -> None:
+    admission = controller(tmp_path, max_concurrent=2, timeout=0.1)
+    admission.acquire("key")
+    admission.acquire("key")
+    with pytest.raises(RuntimeError, match="Timeout"):
+        admission.acquire("key")
+
+
+def test_expired_ticket(tmp_path: Path) -> None:
+    crashed = controller(tmp_path, lease=0.2)
+    crashed.acquire("key")
+    admission = controller(tmp_path, lease=0.2)
+    _, waited = admission.acquire("key")
+    assert 0.1 < waited < 2
@@ -0,0 +1,118 @@
+# Copyright: (c) 2022, Daniel Schmidt <danischm@cisco.com>
+
+import concurrent.futures
+import io
+import json
+from pathlib import Path
+from typing import Any
+
+import httpx
+import pytest
+from pytest_mock import MockerFixture
+
+from nexus_pcv import PCVResult, Validator
+from nexus_pcv.apic import ApicObject
+from nexus_pcv.resolver import ResolverStore
+from nexus_pcv.rules import RuleSet
+
+pytestmark = pytest.mark.unit
+
+TENANT = {"fvTenant": {"attributes": {"dn": "uni/tn-ABC", "name": "ABC"}}}
+
+
+def event(mnemonic: str, severity: str) -> dict[str, Any]:
+    return {
+        "Category": "compliance",
+        "Count": 1,
+        "Description": f"{mnemonic} raised",
+        "Mnemonic": mnemonic,
+        "Severity": severity,
+    }
+
+
+@pytest.fixture
+def validator(mocker: MockerFixture) -> Validator:
+    validator = Validator("10.1.1.1", "admin", "password")
+    mocker.patch.object(validator.ndi, "start_pcv", return_value=(None, "job1"))
+    mocker.patch.object(validator.ndi, "wait_pcv", return_value=(None, "epochjob1"))
+    mocker.patch.object(validator.ndi, "get_pcv_url", return_value=(None, "url1"))
+    return validator
+
+
+@pytest.mark.parametrize(
+    "changes",
+    [
+        TENANT,
+        [TENANT],
+        {"imdata": [TENANT]},
+        io.BytesIO(json.dumps(TENANT).encode()),
+        ApicObject("fvTenant", {"dn": "uni/tn-ABC", "name": "ABC"}, [], None),
+    ],
+)
+def test_validate(validator: Validator, changes: Any, mocker: MockerFixture) -> None:
+    mocker.patch.object(
+        validator.ndi,
+        "get_pcv_results",
+        return_value=(None, [event("A", "warning"), event("B", "major")]),
+    )
+    result = validator.validate("pcv1", "site1", changes)
+    assert isinstance(result, PCVResult)
+    assert result.status == "failed"
+    assert result.job_id == "job1"
+    assert result.epoch_job_id == "epochjob1"
+    assert result.url == "url1"
+    assert [e["Mnemonic"] for e in result.events] == ["A", "B"]
+    assert {"load", "queue", "analysis", "results"} <= set(result.timings)
+    json_data = validator.ndi.start_pcv.call_args.args[3]  # type: ignore[attr-defined]
+    assert json.loads(json_data)["polUni"]["children"][0]["fvTenant"]
+
+    rules = RuleSet(fail_severity="critical")
+    result = validator.validate("pcv1", "site1", TENANT, rules=rules)
+    assert result.passed
+    assert result.to_dict()["status"] == "passed"
+
+
+def test_validate_skipped_and_error(
+    validator: Validator, mocker: MockerFixture
+) -> None:
+    result = validator.validate("pcv1", "site1", [])
+    assert result.status == "skipped"
+    assert result.passed
+    assert result.job_id is None
+
+    validator.ndi.start_pcv.return_value = (  # type: ignore[attr-defined]
+        httpx.Response(500, text="error"),
+        None,
+    )
+    result = validator.validate("pcv1", "site1", tf_changes=[])
+    assert result.status == "skipped"
+    result = validator.validate("pcv1", "site1", TENANT)
+    assert result.status == "error"
+    assert not result.passed
+    assert result.to_dict()["error"] == "NDI request failed (500): error"
+
+
+def test_validate_threads(tmp_path: Path, mocker: MockerFixture) -> None:
+    resolver = ResolverStore(str(tmp_path / "resolver.db"))
+    validator = Validator("10.1.1.1", "admin", "password", resolver=resolver)
+    mocker.patch.object(validator.ndi, "start_pcv", return_value=(None, "job1"))
+    mocker.patch.object(validator.ndi, "wait_pcv", return_value=(None, "epochjob1"))
+    mocker.patch.object(validator.ndi, "get_pcv_url", return_value=(None, "url1"))
+    mocker.patch.object(validator.ndi, "get_pcv_results", return_value=(None, []))
+    bd = {"fvBD": {"attributes": {"dn": "uni/tn-ABC/BD-BD1", "name": "BD1"}}}
+    # parents are resolved from the classnames learned in another thread
+    subnet = {
+        "fvSubnet": {"attributes": {"dn": "uni/tn-DEF/BD-BD2/subnet-[1.1.1.1/24]"}}
+    }
+    with concurrent.futures.ThreadPoolExecutor(4) as executor:
+        assert executor.submit(validator.validate, "pcv", "site1", bd).result().passed
+        futures = [
+            executor.submit(validator.validate, f"pcv{i}", "site1", subnet)
+            for i in range(8)
+        ]
+        results = [f.result() for f in futures]
+    assert [r.status for r in results] == ["passed"] * 8
+    json_data = validator.ndi.start_pcv.call_args.args[3]  # type: ignore[attr-defined]
+    tenant = json.loads(json_data)["polUni"]["children"][0]["fvTenant"]
+    assert list(tenant["children"][0]) == ["fvBD"]
+    resolver.close()
@@ -55,6 +55,20 @@ def test_insert(tree: ApicObject) -> None:
     assert length == len(tree.children)
 
 
+def test_insert_subtree(root: ApicObject) -> None:
+    # subtree built by hand without parent links
+    kid = ApicObject("fvAp", {"dn": "uni/tn-A/ap-AP1"}, [], None)
+    grandkid = ApicObject("fvAEPg", {"dn": "uni/tn-A/ap-AP1/epg-E1"}, [], None)
+    kid.children.append(grandkid)
+    root.insert(ApicObject("fvTenant", {"dn": "uni/tn-A"}, [kid], None))
+    tenant = root.find(dn="uni/tn-A")[0]
+    assert tenant.find(cl="fvAp") == [kid]
+    assert kid.find(cl="fvAEPg") == [grandkid]
+    assert [o.cl for o in kid.query(dn="uni/tn-A/**")] == ["fvAp", "fvAEPg"]
+    child = tenant.add_child("fvBD", {"dn": "uni/tn-A/BD-B1"}, [grandkid.copy()])
+    assert child.find(cl="fvAEPg")[0].parent is child
+
+
 def test_add_child(tree: ApicObject) -> None:
     tree.add_child("c1_3", {"dn": "i4", "name": "n4"}, [])
     assert tree[3].cl == "c1_3"  # type: ignore[union-attr]
@@ -78,3 +92,89 @@ def test_get_root(tree: ApicObject) -> None:
     o.parent = o
     obj = o.get_root()
     assert obj is None
+
+
+def test_copy(tree: ApicObject) -> None:
+    tree.insert(ApicObject("c2_1", {"dn": "i1/i5"}, [], None))
+    obj = tree.copy()
+    assert str(obj) == str(tree)
+    assert obj[0].parent is obj  # type: ignore[union-attr]
+    obj[0].attributes["name"] = "changed"  # type: ignore[union-attr]
+    assert tree[0]["name"] == "n1"  # type: ignore[index]
+
+
+def test_diff(tree: ApicObject) -> None:
+    base = tree.copy()
+    assert tree.diff(base) is None
+    tree.insert(ApicObject("c2_1", {"dn": "i1/i5", "new": "n5"}, [], None))
+    tree[1].update({"new": "n2"}, [])  # type: ignore[union-attr]
+    delta = tree.diff(base)
+    assert delta is not None
+    assert [c["dn"] for c in delta.children] == ["i1", "i2"]  # type: ignore[index]
+    assert delta[0][0]["new"] == "n5"  # type: ignore[index]
+    assert delta[1]["new"] == "n2"  # type: ignore[index]
+    assert tree.diff(None) is not None
+
+
+def test_digest(tree: ApicObject) -> None:
+    base = tree.copy()
+    base.children.reverse()
+    digest = tree.digest()
+    assert base.digest() == digest
+    tree[0].insert(ApicObject("c2_1", {"dn": "i1/i5"}, [], None))  # type: ignore[union-attr]
+    assert tree.digest() != digest
+    assert tree.copy().digest() == tree.digest()
+    digest = tree.digest()
+    child = tree[1].add_child("c2_2", {"name": "n6"}, [])  # type: ignore[union-attr]
+    assert tree.digest() != digest
+    digest = tree.digest()
+    child.attributes["name"] = "changed"
+    child.invalidate()
+    assert tree.digest() != digest
+
+
+def test_digest_inserted_subtree(root: ApicObject) -> None:
+    kid = ApicObject("fvAp", {"dn": "uni/tn-A/ap-AP1"}, [], None)
+    root.insert(ApicObject("fvTenant", {"dn": "uni/tn-A"}, [kid], None))
+    base = root.copy()
+    digest = root.digest()
+    kid.update({"descr": "x"}, [])
+    assert root.digest() != digest
+    delta = root.diff(base)
+    assert delta is not None
+    assert delta.find(dn="uni/tn-A/ap-AP1")[0]["descr"] == "x"
+
+
+def test_query(root: ApicObject) -> None:
+    for name in ("A", "B"):
+        root.insert(ApicObject("fvTenant", {"dn": f"uni/tn-{name}"}, [], None))
+        for epg in ("E1", "E2"):
+            dn = f"uni/tn-{name}/ap-AP/epg-{epg}"
+            root.insert(ApicObject("fvAEPg", {"dn": dn}, [], None))
+            root.insert(ApicObject("fvRsCons", {"dn": f"{dn}/rscons-C"}, [], None))
+    path = "uni/tn-A/ap-AP/epg-E1/rspathAtt-[topology/pod-1/paths-101/pathep-[eth1/1]]"
+    root.insert(ApicObject("fvRsPathAtt", {"dn": path}, [], None))
+
+    assert len(list(root.query(cl="fvRsCons"))) == 4
+    tenant = root.find(dn="uni/tn-A")[0]
+    assert [o["dn"] for o in tenant.query(cl="fvRsCons")] == [
+        "uni/tn-A/ap-AP/epg-E1/rscons-C",
+        "uni/tn-A/ap-AP/epg-E2/rscons-C",
+    ]
+    assert len(list(root.query(dn="uni/tn-*/ap-AP/epg-E?"))) == 4
+    assert len(list(root.query(dn="uni/**/rscons-C"))) == 4
+    assert len(list(root.query(dn="uni/tn-B", prefix=True))) == 6
+    assert len(list(root.query(cl="fvAEPg", dn="uni/tn-B", prefix=True))) == 2
+    assert [o.cl for o in root.query(dn=path)] == ["fvRsPathAtt"]
+    assert [o.cl for o in root.query(dn="uni/tn-A/**/rspathAtt-*")] == ["fvRsPathAtt"]
+
+    # index is maintained by tree operations
+    ap = root.find(dn="uni/tn-A/ap-AP")[0]
+    assert ap.cl is None
+    ap.cl = "fvAp"
+    assert list(root.query(cl="fvAp")) == [ap]
+    ap.add_child("fvAEPg", {"dn": "uni/tn-A/ap-AP/epg-E3"}, [])
+    ap.update({}, [ApicObject("fvAEPg", {"dn": "uni/tn-A/ap-AP/epg-E4"}, [], None)])
+    assert len(list(tenant.query(cl="fvAEPg"))) == 4
+    top = root.add_parent("top", {})
+    assert len(list(top.query(cl="fvAEPg"))) == 6
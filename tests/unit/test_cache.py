@@ -0,0 +1,114 @@
+# Copyright: (c) 2022, Daniel Schmidt <danischm@cisco.com>
+
+import json
+import os
+from pathlib import Path
+
+import pytest
+from pytest_mock import MockerFixture
+
+from nexus_pcv.apic import ApicObject
+from nexus_pcv.cache import InventoryCache
+from nexus_pcv.pcv import PCV
+
+pytestmark = pytest.mark.unit
+
+INVENTORY = {
+    "imdata": [
+        {
+            "fvTenant": {
+                "attributes": {"dn": "uni/tn-ABC", "name": "ABC", "descr": "ü"},
+                "children": [
+                    {"fvBD": {"attributes": {"name": "BD1"}}},
+                    {"fvCtx": {"attributes": {"name": "VRF1", "descr": ""}}},
+                ],
+            }
+        },
+        {"fvAp": {"attributes": {"dn": "uni/tn-DEF/ap-AP1"}}},
+    ]
+}
+
+
+def test_cache_roundtrip(tmp_path: Path) -> None:
+    cache = InventoryCache(str(tmp_path))
+    tree = ApicObject("fvTenant", {"dn": "uni/tn-ABC", "name": "ABC"}, [], None)
+    tree.add_child("fvBD", {"name": "BD1"}, []).add_child("fvSubnet", {}, [])
+    unknown = ApicObject(None, {"dn": "uni/tn-ABC/ap-AP1"}, [], None)
+    assert cache.load(b"data") is None
+    cache.save(b"data", [tree, unknown])
+    objects = cache.load(b"data")
+    assert objects is not None
+    assert [str(o) for o in objects] == [str(tree), str(unknown)]
+    assert objects[0].children[0].parent is objects[0]
+    assert cache.load(b"other") is None
+
+
+def test_cache_invalid_file(tmp_path: Path) -> None:
+    cache = InventoryCache(str(tmp_path))
+    cache.save(b"data", [ApicObject("fvTenant", {"name": "ABC"}, [], None)])
+    path = next(tmp_path.glob("*.bin"))
+    path.write_bytes(path.read_bytes()[:-4])
+    assert cache.load(b"data") is None
+
+
+def test_cache_eviction(tmp_path: Path) -> None:
+    tree = ApicObject("fvTenant", {"name": "ABC"}, [], None)
+    cache = InventoryCache(str(tmp_path))
+    cache.save(b"1", [tree])
+    size = next(tmp_path.glob("*.bin")).stat().st_size
+    cache.max_size = 2 * size
+    cache.save(b"2", [tree])
+    for i, path in enumerate(sorted(tmp_path.glob("*.bin"))):
+        os.utime(path, (i, i))
+    cache.load(b"1")
+    cache.save(b"3", [tree])
+    assert cache.load(b"1") is not None
+    assert cache.load(b"2") is None
+    assert cache.load(b"3") is not None
+
+
+def test_cache_unwritable(tmp_path: Path, mocker: MockerFixture) -> None:
+    tree = ApicObject("fvTenant", {"name": "ABC"}, [], None)
+    cache = InventoryCache(str(tmp_path))
+    mocker.patch("nexus_pcv.cache.os.replace", side_effect=PermissionError("denied"))
+    cache.save(b"data", [tree])
+    assert list(tmp_path.iterdir()) == []
+
+
+@pytest.mark.parametrize("cached", [False, True])
+def test_load_json_files_resolved_once(
+    tmp_path: Path, cached: bool, mocker: MockerFixture
+) -> None:
+    path = tmp_path / "inventory.json"
+    path.write_text(json.dumps(INVENTORY))
+    cache = InventoryCache(str(tmp_path / "cache")) if cached else None
+    pcv = PCV("10.1.1.1", "admin", "password", "local", 1)
+    resolve = mocker.spy(pcv, "_resolve_static_classnames")
+    pcv.load_json_files([str(path)], cache)
+    # each object of the merged tree is resolved exactly once
+    assert resolve.call_count == len(list(pcv.root.query()))
+
+
+def test_load_json_files_cache_unwritable(tmp_path: Path) -> None:
+    path = tmp_path / "inventory.json"
+    path.write_text(json.dumps(INVENTORY))
+    # cache directory cannot be created
+    (tmp_path / "cache").write_text("")
+    cached = PCV("10.1.1.1", "admin", "password", "local", 1)
+    cached.load_json_files([str(path)], InventoryCache(str(tmp_path / "cache")))
+    pcv = PCV("10.1.1.1", "admin", "password", "local", 1)
+    pcv.load_json_files([str(path)])
+    assert str(cached.root) == str(pcv.root)
+
+
+def test_load_json_files_cached(tmp_path: Path) -> None:
+    path = tmp_path / "inventory.json"
+    path.write_text(json.dumps(INVENTORY))
+    cache = InventoryCache(str(tmp_path / "cache"))
+    results = []
+    for _ in range(2):
+        pcv = PCV("10.1.1.1", "admin", "password", "local", 1)
+        pcv.load_json_files([str(path)], cache)
+        results.append(str(pcv.root))
+    assert len(list((tmp_path / "cache").glob("*.bin"))) == 1
+    assert results[0] == results[1]
@@ -0,0 +1,43 @@
+# Copyright: (c) 2022, Daniel Schmidt <danischm@cisco.com>
+
+import subprocess  # nosec B404
+import sys
+
+import pytest
+from typer.testing import CliRunner
+
+import nexus_pcv
+from nexus_pcv.cli.main import app
+
+pytestmark = pytest.mark.unit
+
+# Cumulative import time budget of the CLI module in microseconds
+IMPORT_TIME_BUDGET = 250_000
+
+# Modules only required for the validation path
+HEAVY_MODULES = ["httpx", "yaml", "nexus_pcv.pcv", "nexus_pcv.const"]
+
+
+def test_version() -> None:
+    result = CliRunner().invoke(app, ["--version"])
+    assert result.exit_code == 0
+    assert f"nexus-pcv version {nexus_pcv.__version__}" in result.output
+
+
+def test_import_time() -> None:
+    result = subprocess.run(  # nosec B603
+        [sys.executable, "-X", "importtime", "-c", "import nexus_pcv.cli.main"],
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    imports = {}
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        _, cumulative, module = line.split("|")
+        if cumulative.strip().isdigit():
+            imports[module.strip()] = int(cumulative)
+    for module in HEAVY_MODULES:
+        assert module not in imports, f"'{module}' imported at CLI startup"
+    assert imports["nexus_pcv.cli.main"] < IMPORT_TIME_BUDGET
@@ -0,0 +1,63 @@
+# Copyright: (c) 2022, Daniel Schmidt <danischm@cisco.com>
+
+import json
+
+import pytest
+
+from nexus_pcv import codec
+from nexus_pcv.apic import ApicObject
+
+pytestmark = pytest.mark.unit
+
+
+@pytest.mark.parametrize(
+    "value",
+    [
+        "uni/tn-ABC",
+        'quote " and \\ backslash',
+        "\x00\x1f\x7f",
+        "äöü €",
+        "\ud800",
+        1,
+        1.5,
+        None,
+        True,
+    ],
+)
+def test_dumps(value: object) -> None:
+    assert codec.dumps(value) == json.dumps(value)
+
+
+@pytest.mark.parametrize(
+    "data",
+    [
+        '{"a": [1, 2.5, "x", null, true]}',
+        b'{"a": "\\u00e4"}',
+        "[NaN]",
+    ],
+)
+def test_loads(data: str | bytes) -> None:
+    assert json.dumps(codec.loads(data)) == json.dumps(json.loads(data))
+
+
+def test_loads_invalid() -> None:
+    with pytest.raises(json.JSONDecodeError):
+        codec.loads('{"a": ')
+
+
+def test_apic_object_str() -> None:
+    obj = ApicObject("fvTenant", {"dn": "uni/tn-ÄBC", "descr": "a\x7f"}, [], None)
+    obj.add_child("fvAp", {"name": "ap1"}, [])
+    obj.add_child("fvAp", {"name": "ap2"}, [])
+    expected = json.dumps(
+        {
+            "fvTenant": {
+                "attributes": {"dn": "uni/tn-ÄBC", "descr": "a\x7f"},
+                "children": [
+                    {"fvAp": {"attributes": {"name": "ap1"}, "children": []}},
+                    {"fvAp": {"attributes": {"name": "ap2"}, "children": []}},
+                ],
+            }
+        }
+    )
+    assert str(obj) == expected
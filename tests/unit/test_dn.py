@@ -0,0 +1,48 @@
+# Copyright: (c) 2022, Daniel Schmidt <danischm@cisco.com>
+
+import pytest
+
+from nexus_pcv.dn import parent_dn, parse_dn, split_rn
+from nexus_pcv.pcv import PCV
+
+pytestmark = pytest.mark.unit
+
+
+def test_parse_dn() -> None:
+    assert parse_dn("uni/tn-ABC/ap-AP1") == ("uni", "tn-ABC", "ap-AP1")
+    assert parse_dn("uni") == ("uni",)
+    assert parse_dn("uni/tn-ABC/ap-AP1/epg-EPG1/rsdomAtt-[uni/phys-PHY1]") == (
+        "uni",
+        "tn-ABC",
+        "ap-AP1",
+        "epg-EPG1",
+        "rsdomAtt-[uni/phys-PHY1]",
+    )
+    assert (
+        parse_dn(
+            "uni/tn-ABC/out-L3OUT1/lnodep-NP1/lifp-IP1/rspathL3OutAtt-[topology/pod-1/paths-101/pathep-[eth1/1]]"
+        )[-1]
+        == "rspathL3OutAtt-[topology/pod-1/paths-101/pathep-[eth1/1]]"
+    )
+    assert parse_dn("uni/tn-ABC") is parse_dn("uni/tn-ABC")
+
+
+def test_parent_dn() -> None:
+    assert parent_dn("uni/tn-ABC/ap-AP1") == "uni/tn-ABC"
+    assert parent_dn("uni/tn-ABC/rsdomAtt-[uni/phys-PHY1]") == "uni/tn-ABC"
+    assert parent_dn("uni") == ""
+
+
+def test_split_rn() -> None:
+    assert split_rn("tn-ABC") == ("tn", "ABC")
+    assert split_rn("tn-A-B") == ("tn", "A-B")
+    assert split_rn("uni") == ("uni", None)
+
+
+def test_resolve_bracketed_rn() -> None:
+    pcv = PCV("10.1.1.1", "admin", "password", "local", 1)
+    dn = "uni/tn-ABC/ap-AP1/epg-EPG1/rsdomAtt-[uni/phys-PHY1]/rsdomAttChild-1"
+    pcv.load_json([{"childClass": {"attributes": {"dn": dn}}}])
+    obj = pcv.root.find(dn="uni/tn-ABC/ap-AP1/epg-EPG1/rsdomAtt-[uni/phys-PHY1]")[0]
+    assert obj.cl == "fvRsDomAtt"
+    assert obj.attributes["tDn"] == "uni/phys-PHY1"
@@ -0,0 +1,233 @@
+# Copyright: (c) 2022, Daniel Schmidt <danischm@cisco.com>
+
+import json
+import threading
+import time
+from typing import Any
+
+import httpx
+import pytest
+from pytest_mock import MockerFixture
+
+from nexus_pcv.ndi import NDI
+from nexus_pcv.rules import RuleSet
+
+pytestmark = pytest.mark.unit
+
+
+@pytest.fixture
+def ndi() -> NDI:
+    ndi = NDI("10.1.1.1", "admin", "password", "local", 1)
+    ndi.authenticated = True
+    return ndi
+
+
+def event(mnemonic: str, severity: str = "major", count: int = 1) -> dict[str, Any]:
+    return {
+        "category": "compliance",
+        "count": count,
+        "anomalyStr": f"{mnemonic} raised",
+        "mnemonicTitle": mnemonic,
+        "severity": severity,
+    }
+
+
+def page(entries: list[Any]) -> httpx.Response:
+    return httpx.Response(200, json={"entries": entries})
+
+
+def test_get_pcv_results_pages(ndi: NDI, mocker: MockerFixture) -> None:
+    get = mocker.patch.object(
+        ndi.session,
+        "get",
+        side_effect=[
+            page([event("A"), event("B", severity="info")]),
+            page([event("C"), event("D", count=0)]),
+            page([event("E")]),
+        ],
+    )
+    streamed: list[Any] = []
+    err, events = ndi.get_pcv_results(
+        "LAB", "LAB1", "1", "C,F", on_event=streamed.append, page_size=2
+    )
+    assert err is None
+    assert events is not None
+    assert [e["Description"] for e in events] == ["A raised", "E raised"]
+    assert streamed == events
+    assert get.call_count == 3
+    assert [c.kwargs["params"]["$page"] for c in get.call_args_list] == [0, 1, 2]
+
+
+def test_get_pcv_results_unpaginated(ndi: NDI, mocker: MockerFixture) -> None:
+    get = mocker.patch.object(
+        ndi.session, "get", return_value=page([event("A"), event("B")])
+    )
+    err, events = ndi.get_pcv_results("LAB", "LAB1", "1", ["B"], page_size=2)
+    assert err is None
+    assert events is not None
+    assert len(events) == 1
+    assert get.call_count == 2
+
+
+def test_get_pcv_results_error(ndi: NDI, mocker: MockerFixture) -> None:
+    mocker.patch.object(
+        ndi.session,
+        "get",
+        side_effect=[page([event("A")]), httpx.Response(500, json={"error": "x"})],
+    )
+    err, events = ndi.get_pcv_results("LAB", "LAB1", "1", "", page_size=1)
+    assert err is not None
+    assert err.status_code == 500
+    assert events is None
+
+
+def test_get_pcv_results_details(ndi: NDI, mocker: MockerFixture) -> None:
+    def get(url: str, params: dict[str, Any]) -> httpx.Response:
+        if url.endswith("aggregateTable"):
+            return page([event("A"), event("B"), event("C")])
+        mnemonic = params["$mnemonicTitle"]
+        return page([{"affectedObjects": [{"dn": f"uni/tn-{mnemonic}"}]}])
+
+    mocker.patch.object(ndi.session, "get", side_effect=get)
+    rules = RuleSet()
+    rules.add_rule({"dn_regex": "^uni/tn-B$"})
+    streamed: list[Any] = []
+    err, events = ndi.get_pcv_results(
+        "LAB", "LAB1", "1", rules, on_event=streamed.append, details=True
+    )
+    assert err is None
+    assert events is not None
+    assert [e["Affected Objects"] for e in events] == [["uni/tn-A"], ["uni/tn-C"]]
+    assert streamed == events
+
+
+def test_get_pcv_results_dn_rules(ndi: NDI, mocker: MockerFixture) -> None:
+    def get(url: str, params: dict[str, Any]) -> httpx.Response:
+        if url.endswith("aggregateTable"):
+            return page([event("A"), event("B")])
+        mnemonic = params["$mnemonicTitle"]
+        return page([{"affectedObjects": [{"dn": f"uni/tn-{mnemonic}"}]}])
+
+    mocker.patch.object(ndi.session, "get", side_effect=get)
+    rules = RuleSet()
+    rules.add_rule({"dn_regex": "^uni/tn-B$"})
+    assert rules.matches_dns
+    err, events = ndi.get_pcv_results("LAB", "LAB1", "1", rules)
+    assert err is None
+    assert events is not None
+    assert [e["Description"] for e in events] == ["A raised"]
+
+
+def test_request_retries(ndi: NDI, mocker: MockerFixture) -> None:
+    sleep = mocker.patch("nexus_pcv.ndi.time.sleep")
+    get = mocker.patch.object(
+        ndi.session,
+        "get",
+        side_effect=[
+            httpx.Response(502, text="<html>Bad Gateway</html>"),
+            httpx.Response(429, headers={"Retry-After": "7"}),
+            page([event("A")]),
+        ],
+    )
+    err, events = ndi.get_pcv_results("LAB", "LAB1", "1", "")
+    assert err is None
+    assert events is not None and len(events) == 1
+    assert get.call_count == 3
+    assert sleep.call_args_list[1].args == (7.0,)
+
+
+def test_request_relogin(ndi: NDI, mocker: MockerFixture) -> None:
+    post = mocker.patch.object(ndi.session, "post", return_value=httpx.Response(200))
+    mocker.patch.object(
+        ndi.session, "get", side_effect=[httpx.Response(401), page([event("A")])]
+    )
+    err, events = ndi.get_pcv_results("LAB", "LAB1", "1", "")
+    assert err is None
+    assert events is not None and len(events) == 1
+    assert post.call_args.args == (ndi.login_url,)
+
+
+def test_request_circuit_breaker(ndi: NDI, mocker: MockerFixture) -> None:
+    mocker.patch("nexus_pcv.ndi.time.sleep")
+    get = mocker.patch.object(
+        ndi.session, "get", side_effect=httpx.ConnectError("refused")
+    )
+    with pytest.raises(httpx.ConnectError):
+        ndi.get_pcv_results("LAB", "LAB1", "1", "")
+    assert get.call_count == ndi.retry.max_attempts
+    with pytest.raises(RuntimeError, match="unavailable"):
+        ndi.get_pcv_results("LAB", "LAB1", "1", "")
+    assert get.call_count == ndi.retry.max_attempts
+
+
+def test_start_pcv_ambiguous_failure(ndi: NDI, mocker: MockerFixture) -> None:
+    mocker.patch("nexus_pcv.ndi.time.sleep")
+
+    def get(url: str, **kwargs: Any) -> httpx.Response:
+        blob = post.call_args.kwargs["files"][0][1][1]
+        file_name = json.loads(blob)["uploadedFileName"]
+        data = [
+            # concurrent submission with the same name
+            {"jobId": "1", "name": "PCV1", "uploadedFileName": "other.json"},
+            {"jobId": "2", "name": "PCV1", "uploadedFileName": file_name},
+        ]
+        return httpx.Response(200, json={"value": {"data": data}})
+
+    mocker.patch.object(ndi.session, "get", side_effect=get)
+    post = mocker.patch.object(
+        ndi.session, "post", side_effect=httpx.ReadTimeout("timeout")
+    )
+    err, job_id = ndi.start_pcv("PCV1", "LAB", "LAB1", "{}", epoch_id="E1")
+    assert err is None
+    assert job_id == "2"
+    assert post.call_count == 1
+
+
+def test_start_pcv_resubmit(ndi: NDI, mocker: MockerFixture) -> None:
+    mocker.patch("nexus_pcv.ndi.time.sleep")
+    no_jobs = httpx.Response(200, json={"value": {"data": []}})
+    get = mocker.patch.object(ndi.session, "get", return_value=no_jobs)
+    started = httpx.Response(200, json={"value": {"data": {"jobId": "3"}}})
+    post = mocker.patch.object(
+        ndi.session, "post", side_effect=[httpx.Response(503), started]
+    )
+    assert ndi.start_pcv("PCV1", "LAB", "LAB1", "{}", epoch_id="E1") == (None, "3")
+    assert post.call_count == 2
+    assert get.call_count == 1
+
+
+def test_start_pcv_rate_limited(ndi: NDI, mocker: MockerFixture) -> None:
+    mocker.patch("nexus_pcv.ndi.time.sleep")
+    get = mocker.patch.object(ndi.session, "get")
+    post = mocker.patch.object(ndi.session, "post", return_value=httpx.Response(429))
+    err, job_id = ndi.start_pcv("PCV1", "LAB", "LAB1", "{}", epoch_id="E1")
+    assert err is not None and err.status_code == 429
+    assert job_id is None
+    # not processed by NDI, no need to look for a created analysis
+    assert post.call_count == ndi.retry.max_attempts
+    get.assert_not_called()
+
+
+def test_wait_pcv_cancelled(ndi: NDI, mocker: MockerFixture) -> None:
+    running = {"value": {"data": {"analysisStatus": "RUNNING"}}}
+    mocker.patch.object(
+        ndi.session, "get", return_value=httpx.Response(200, json=running)
+    )
+    delete = mocker.patch.object(
+        ndi.session, "delete", return_value=httpx.Response(200)
+    )
+    cancel = threading.Event()
+    cancel.set()
+    assert ndi.wait_pcv("LAB", "LAB1", "job1", cancel) == (None, None)
+    assert ndi.delete_pcv("LAB", "LAB1", "job1") is None
+    assert delete.call_args.args[0].endswith("/prechangeAnalysis/job1")
+
+
+def test_wait_pcv_deadline(ndi: NDI, mocker: MockerFixture) -> None:
+    running = {"value": {"data": {"analysisStatus": "RUNNING"}}}
+    get = mocker.patch.object(
+        ndi.session, "get", return_value=httpx.Response(200, json=running)
+    )
+    with pytest.raises(TimeoutError):
+        ndi.wait_pcv("LAB", "LAB1", "job1", deadline=time.monotonic() + 0.05)
+    assert get.call_args.kwargs["timeout"] <= 0.05
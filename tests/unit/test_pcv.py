@@ -0,0 +1,287 @@
+# Copyright: (c) 2022, Daniel Schmidt <danischm@cisco.com>
+
+import json
+import threading
+from pathlib import Path
+from typing import Any
+
+import httpx
+import pytest
+from pytest_mock import MockerFixture
+
+from nexus_pcv.pcv import PCV
+
+pytestmark = pytest.mark.unit
+
+TENANT = {"fvTenant": {"attributes": {"dn": "uni/tn-ABC", "name": "ABC"}}}
+
+
+@pytest.fixture
+def pcv() -> PCV:
+    return PCV("10.1.1.1", "admin", "password", "local", 1)
+
+
+def test_prefetch_epoch(pcv: PCV, tmp_path: Path, mocker: MockerFixture) -> None:
+    loaded = threading.Event()
+
+    def get_last_epoch_id(group: str, site: str) -> Any:
+        # lookup completes only after the local tree has been loaded
+        assert loaded.wait(5)
+        return None, "epoch1"
+
+    mocker.patch.object(pcv.ndi, "get_last_epoch_id", side_effect=get_last_epoch_id)
+    start_pcv = mocker.patch.object(
+        pcv.ndi, "start_pcv", return_value=(httpx.Response(500), None)
+    )
+    path = tmp_path / "tenant.json"
+    path.write_text(json.dumps(TENANT))
+
+    pcv.prefetch_epoch("group1", "site1")
+    pcv.load_json_files([str(path)])
+    loaded.set()
+    pcv.ndi_pcv("pcv1", "group1", "site1", "", "", "")
+    assert start_pcv.call_args.args[4] == "epoch1"
+    assert not pcv.prefetched
+
+
+def test_prefetch_epoch_failed(pcv: PCV, tmp_path: Path, mocker: MockerFixture) -> None:
+    mocker.patch.object(
+        pcv.ndi, "get_last_epoch_id", return_value=(httpx.Response(401), None)
+    )
+    start_pcv = mocker.patch.object(pcv.ndi, "start_pcv")
+    path = tmp_path / "tenant.json"
+    path.write_text(json.dumps(TENANT))
+
+    pcv.prefetch_epoch("group1", "site1")
+    pcv.prefetched[("group1", "site1")].result()
+    pcv.load_json_files([str(path)])
+    err, events, url = pcv.ndi_pcv("pcv1", "group1", "site1", "", "", "")
+    assert err is not None and err.status_code == 401
+    start_pcv.assert_not_called()
+
+
+def test_prefetch_epoch_failed_no_changes(pcv: PCV, mocker: MockerFixture) -> None:
+    mocker.patch.object(
+        pcv.ndi, "get_last_epoch_id", side_effect=httpx.ConnectError("refused")
+    )
+    pcv.prefetch_epoch("group1", "site1")
+    pcv.prefetched[("group1", "site1")].exception()
+    pcv.load_json_files([])
+    assert pcv.ndi_pcv("pcv1", "group1", "site1", "", "", "") == (None, None, None)
+
+
+def test_prefetch_epoch_exception(pcv: PCV, mocker: MockerFixture) -> None:
+    mocker.patch.object(
+        pcv.ndi, "get_last_epoch_id", side_effect=httpx.ConnectError("refused")
+    )
+    pcv.prefetch_epoch("group1", "site1")
+    pcv.load_json([TENANT])
+    with pytest.raises(RuntimeError, match="Base epoch lookup failed: refused"):
+        pcv.ndi_pcv("pcv1", "group1", "site1", "", "", "")
+
+
+FABRIC = {
+    "imdata": [
+        {
+            "fvTenant": {
+                "attributes": {"dn": "uni/tn-ABC", "name": "ABC", "descr": ""},
+                "children": [
+                    {"fvBD": {"attributes": {"name": "BD1", "arpFlood": "yes"}}},
+                    {
+                        "fvCtx": {
+                            "attributes": {"name": "VRF1", "pcEnfPref": "enforced"}
+                        }
+                    },
+                ],
+            }
+        }
+    ]
+}
+
+
+def test_prune_noops(pcv: PCV, tmp_path: Path, mocker: MockerFixture) -> None:
+    start_pcv = mocker.patch.object(
+        pcv.ndi, "start_pcv", return_value=(httpx.Response(500), None)
+    )
+    path = tmp_path / "fabric.json"
+    path.write_text(json.dumps(FABRIC))
+    pcv.load_fabric_snapshot([str(path)])
+    pcv.load_json(
+        [
+            {
+                "fvTenant": {
+                    "attributes": {"dn": "uni/tn-ABC", "name": "ABC"},
+                    "children": [
+                        {"fvBD": {"attributes": {"name": "BD1", "arpFlood": "yes"}}},
+                        {"fvCtx": {"attributes": {"name": "VRF1"}}},
+                        {"fvAp": {"attributes": {"name": "AP1", "status": "deleted"}}},
+                    ],
+                }
+            }
+        ]
+    )
+    assert pcv.ndi_pcv("pcv1", "group1", "site1", "", "", "") == (None, None, None)
+    start_pcv.assert_not_called()
+
+    pcv.load_json(
+        [{"fvCtx": {"attributes": {"dn": "uni/tn-ABC/ctx-VRF1", "descr": "new"}}}]
+    )
+    pcv.ndi_pcv("pcv1", "group1", "site1", "", "", "")
+    submitted = json.loads(start_pcv.call_args.args[3])
+    tenant = submitted["polUni"]["children"][0]["fvTenant"]
+    assert [list(c) for c in tenant["children"]] == [["fvCtx"]]
+    assert tenant["children"][0]["fvCtx"]["attributes"]["descr"] == "new"
+
+
+def test_load_inputs(pcv: PCV, tmp_path: Path, mocker: MockerFixture) -> None:
+    paths = [tmp_path / "a.json", tmp_path / "b.json"]
+    for path, name in zip(paths, ("A", "B"), strict=True):
+        path.write_text(
+            json.dumps({"fvTenant": {"attributes": {"dn": f"uni/tn-{name}"}}})
+        )
+    filenames = [str(p) for p in paths]
+    pcv.load_inputs(filenames)
+    read = mocker.spy(pcv, "_read_json_file")
+    paths[1].write_text(json.dumps({"fvTenant": {"attributes": {"dn": "uni/tn-C"}}}))
+    pcv.load_inputs(filenames, modified={filenames[1]})
+    assert [c.args[0] for c in read.call_args_list] == [filenames[1]]
+    assert [t["name"] for t in pcv.root.find(cl="fvTenant")] == ["A", "C"]
+
+
+def test_validate_cancelled(pcv: PCV, mocker: MockerFixture) -> None:
+    mocker.patch.object(pcv.ndi, "start_pcv", return_value=(None, "job1"))
+    wait_pcv = mocker.patch.object(pcv.ndi, "wait_pcv", return_value=(None, None))
+    delete_pcv = mocker.patch.object(pcv.ndi, "delete_pcv", return_value=None)
+    cancel = threading.Event()
+    pcv.load_json([TENANT])
+    result = pcv.validate("pcv1", "group1", "site1", cancel=cancel)
+    assert result.status == "cancelled"
+    assert wait_pcv.call_args.args[3] is cancel
+    delete_pcv.assert_called_once_with("group1", "site1", "job1")
+
+
+@pytest.mark.parametrize("error", [TimeoutError, KeyboardInterrupt])
+def test_validate_abandoned(
+    pcv: PCV, error: type[BaseException], mocker: MockerFixture
+) -> None:
+    mocker.patch.object(pcv.ndi, "start_pcv", return_value=(None, "job1"))
+    mocker.patch.object(pcv.ndi, "wait_pcv", side_effect=error)
+    delete_pcv = mocker.patch.object(pcv.ndi, "delete_pcv", return_value=None)
+    pcv.load_json([TENANT])
+    if error is TimeoutError:
+        assert pcv.validate("pcv1", "group1", "site1").status == "timeout"
+        with pytest.raises(TimeoutError):
+            pcv.ndi_pcv("pcv1", "group1", "site1", "", "", "")
+    else:
+        with pytest.raises(KeyboardInterrupt):
+            pcv.validate("pcv1", "group1", "site1")
+    assert delete_pcv.call_args.args == ("group1", "site1", "job1")
+
+
+def test_ndi_pcv_error_reports(pcv: PCV, tmp_path: Path, mocker: MockerFixture) -> None:
+    mocker.patch.object(
+        pcv.ndi, "start_pcv", return_value=(httpx.Response(500, text="down"), None)
+    )
+    files = [str(tmp_path / "results.xml"), str(tmp_path / "results.sarif")]
+    pcv.load_json([TENANT])
+    err, events, url = pcv.ndi_pcv("pcv1", "group1", "site1", "", files, "")
+    assert err is not None and events is None
+    junit = (tmp_path / "results.xml").read_text()
+    assert "No anomalies raised" not in junit
+    assert "NDI request failed (500): down" in junit
+    sarif = json.loads((tmp_path / "results.sarif").read_text())
+    assert sarif["runs"][0]["invocations"][0]["executionSuccessful"] is False
+
+
+def tf_plan(
+    path: Path,
+    *changes: tuple[str, str, dict[str, str]],
+    actions: tuple[str, ...] = ("create",),
+) -> str:
+    resource_changes = [
+        {
+            "type": "aci_rest_managed",
+            "change": {
+                "actions": list(actions),
+                "after": {"dn": dn, "class_name": cl, "content": content},
+            },
+        }
+        for dn, cl, content in changes
+    ]
+    path.write_text(json.dumps({"resource_changes": resource_changes}))
+    return str(path)
+
+
+def test_load_tf_plans(pcv: PCV, tmp_path: Path) -> None:
+    tenant = ("uni/tn-ABC", "fvTenant", {"name": "ABC"})
+    plans = [
+        tf_plan(tmp_path / "a.json", tenant, ("uni/tn-ABC/BD-B1", "fvBD", {})),
+        tf_plan(tmp_path / "b.json", tenant, ("uni/tn-ABC/ctx-V1", "fvCtx", {})),
+    ]
+    pcv.load_tf_plans(plans, workers=2)
+    assert [c.cl for c in pcv.root.find(dn="uni/tn-ABC")[0].children] == [
+        "fvBD",
+        "fvCtx",
+    ]
+
+    conflicting = tf_plan(
+        tmp_path / "c.json", ("uni/tn-ABC", "fvTenant", {"descr": "C"})
+    )
+    pcv = PCV("10.1.1.1", "admin", "password", "local", 1)
+    with pytest.raises(RuntimeError, match="Conflicting changes.*'uni/tn-ABC'"):
+        pcv.load_tf_plans([*plans, conflicting], workers=1)
+
+
+def test_load_tf_plans_no_op(pcv: PCV, tmp_path: Path) -> None:
+    plans = [
+        tf_plan(
+            tmp_path / "a.json",
+            ("uni/tn-ABC", "fvTenant", {"name": "ABC"}),
+            ("uni/tn-ABC/BD-B1", "fvBD", {"name": "B1"}),
+            actions=("no-op",),
+        ),
+        tf_plan(tmp_path / "b.json", ("uni/tn-ABC", "fvTenant", {"descr": "B"})),
+        tf_plan(
+            tmp_path / "c.json",
+            ("uni/tn-ABC/BD-B1/subnet-[1.1.1.1/24]", "fvSubnet", {}),
+        ),
+    ]
+    pcv.load_tf_plans(plans, workers=1)
+    tenant = pcv.root.find(dn="uni/tn-ABC")[0]
+    assert tenant.attributes["descr"] == "B"
+    # classname of the parent is still resolved from the no-op entry
+    assert [c.cl for c in tenant.children] == ["fvBD"]
+
+
+def test_validate_incremental(tmp_path: Path, mocker: MockerFixture) -> None:
+    state = str(tmp_path / "state")
+
+    def run(bds: list[str], events: list[Any]) -> tuple[str, str]:
+        pcv = PCV("10.1.1.1", "admin", "password", "local", 1)
+        mocker.patch.object(pcv.ndi, "get_last_epoch_id", return_value=(None, "e1"))
+        start_pcv = mocker.patch.object(
+            pcv.ndi, "start_pcv", return_value=(None, "job1")
+        )
+        mocker.patch.object(pcv.ndi, "wait_pcv", return_value=(None, "ej1"))
+        mocker.patch.object(pcv.ndi, "get_pcv_results", return_value=(None, events))
+        mocker.patch.object(pcv.ndi, "get_pcv_url", return_value=(None, "url"))
+        children = [{"fvBD": {"attributes": {"name": bd}}} for bd in bds]
+        tenant = {"fvTenant": {**TENANT["fvTenant"], "children": children}}
+        pcv.load_json([tenant])
+        result = pcv.validate("pcv1", "group1", "site1", incremental_state=state)
+        if not start_pcv.called:
+            return result.status, ""
+        tree = json.loads(start_pcv.call_args.args[3])
+        submitted = tree["polUni"]["children"][0]["fvTenant"]["children"]
+        return result.status, ",".join(
+            c["fvBD"]["attributes"]["name"] for c in submitted
+        )
+
+    assert run(["BD1"], []) == ("passed", "BD1")
+    assert run(["BD1", "BD2"], []) == ("passed", "BD2")
+    assert run(["BD1", "BD2"], []) == ("skipped", "")
+    # snapshot is only saved if the validation passed without events
+    failing = [{"Severity": "major", "Description": "x"}]
+    assert run(["BD1", "BD2", "BD3"], failing) == ("failed", "BD3")
+    assert run(["BD1", "BD2", "BD3"], []) == ("passed", "BD3")
+    assert run(["BD1", "BD2", "BD3"], []) == ("skipped", "")
@@ -0,0 +1,69 @@
+# Copyright: (c) 2022, Daniel Schmidt <danischm@cisco.com>
+
+from pathlib import Path
+
+import pytest
+
+from nexus_pcv.apic import ApicObject
+from nexus_pcv.pcv import PCV
+from nexus_pcv.resolver import ResolverStore
+
+pytestmark = pytest.mark.unit
+
+NODE_PROFILE = {
+    "l3extLNodeP": {
+        "attributes": {"dn": "uni/tn-ABC/out-L3OUT1/lnodep-NP1", "name": "NP1"},
+        "children": [
+            {
+                "l3extLIfP": {
+                    "attributes": {
+                        "dn": "uni/tn-ABC/out-L3OUT1/lnodep-NP1/lifp-IP1",
+                        "name": "IP1",
+                    }
+                }
+            }
+        ],
+    }
+}
+
+INTERFACE = {
+    "l3extRsPathL3OutAtt": {
+        "attributes": {
+            "dn": "uni/tn-DEF/out-L3OUT2/lnodep-NP2/lifp-IP2/rspathL3OutAtt-[topology/pod-1/paths-101/pathep-[eth1/1]]",
+            "tDn": "topology/pod-1/paths-101/pathep-[eth1/1]",
+        }
+    }
+}
+
+
+def test_resolver_store(tmp_path: Path) -> None:
+    db = str(tmp_path / "resolver.db")
+    pcv = PCV("10.1.1.1", "admin", "password", "local", 1)
+    with pytest.raises(ValueError, match="Missing classname"):
+        pcv.load_json([INTERFACE])
+
+    pcv = PCV("10.1.1.1", "admin", "password", "local", 1, resolver=ResolverStore(db))
+    pcv.load_json([NODE_PROFILE])
+
+    # learned mappings are persisted across runs
+    pcv = PCV("10.1.1.1", "admin", "password", "local", 1, resolver=ResolverStore(db))
+    pcv.load_json([INTERFACE])
+    lifp = pcv.root.find(dn="uni/tn-DEF/out-L3OUT2/lnodep-NP2/lifp-IP2")[0]
+    assert lifp.cl == "l3extLIfP"
+    assert lifp.attributes["name"] == "IP2"
+    assert lifp.parent is not None and lifp.parent.cl == "l3extLNodeP"
+
+
+def test_resolver_store_ambiguous(tmp_path: Path) -> None:
+    resolver = ResolverStore(str(tmp_path / "resolver.db"))
+    tree = ApicObject("fvTenant", {"dn": "uni/tn-ABC", "name": "ABC"}, [], None)
+    tree.add_child("classA", {"dn": "uni/tn-ABC/x-1"}, [])
+    tree.add_child("classA", {"dn": "uni/tn-ABC/y-1"}, [])
+    tree.add_child("classB", {"dn": "uni/x-1"}, [])
+    resolver.learn(tree)
+
+    unresolved = ApicObject("fvTenant", {"dn": "uni/tn-DEF"}, [], None)
+    for dn in ("uni/tn-DEF/x-2", "uni/tn-DEF/y-2", "uni/x-2", "uni/tn-DEF/z-2"):
+        unresolved.add_child(None, {"dn": dn}, [])  # type: ignore[arg-type]
+    resolver.resolve(unresolved)
+    assert [c.cl for c in unresolved.children] == ["classA", "classA", "classB", None]
@@ -0,0 +1,60 @@
+# Copyright: (c) 2022, Daniel Schmidt <danischm@cisco.com>
+
+from pathlib import Path
+from typing import Any
+
+import pytest
+
+from nexus_pcv.rules import RuleSet
+
+pytestmark = pytest.mark.unit
+
+RULES = """
+suppress:
+  - mnemonic: [MNEMONIC_1, MNEMONIC_2]
+  - category: Compliance
+  - category: system
+    max_severity: minor
+  - mnemonic_regex: "^BD_"
+    dn_regex: "^uni/tn-LAB/"
+fail:
+  severity: major
+  max_events: 1
+"""
+
+
+def event(
+    mnemonic: str, category: str = "connectivity", severity: str = "critical", **kw: Any
+) -> dict[str, Any]:
+    return {"mnemonicTitle": mnemonic, "category": category, "severity": severity, **kw}
+
+
+def test_suppress_events() -> None:
+    rules = RuleSet.from_suppress_events("MNEMONIC_1,MNEMONIC_2")
+    assert rules.suppressed(event("MNEMONIC_1"))
+    assert rules.suppressed(event("OTHER", severity="info"))
+    assert not rules.suppressed(event("OTHER", severity="warning"))
+    assert not RuleSet.from_suppress_events("").suppressed(event("MNEMONIC_1"))
+
+
+def test_rules_file(tmp_path: Path) -> None:
+    filename = tmp_path / "rules.yaml"
+    filename.write_text(RULES)
+    rules = RuleSet.from_suppress_events("")
+    rules.load(str(filename))
+    assert rules.suppressed(event("MNEMONIC_2"))
+    assert rules.suppressed(event("OTHER", category="compliance"))
+    assert rules.suppressed(event("OTHER", category="system", severity="minor"))
+    assert not rules.suppressed(event("OTHER", category="system", severity="major"))
+    assert rules.suppressed(event("BD_X", affectedObjects=["uni/tn-LAB/BD-1"]))
+    assert not rules.suppressed(event("BD_X", affectedObjects=["uni/tn-PROD/BD-1"]))
+    assert not rules.suppressed(event("BD_X"))
+    assert rules.passed([{"Severity": "critical"}, {"Severity": "minor"}])
+    assert not rules.passed([{"Severity": "critical"}, {"Severity": "major"}])
+
+
+def test_invalid_rules_file(tmp_path: Path) -> None:
+    filename = tmp_path / "rules.yaml"
+    filename.write_text("suppress:\n  - unknown: x\n")
+    with pytest.raises(RuntimeError, match="unknown"):
+        RuleSet().load(str(filename))
@@ -0,0 +1,62 @@
+# Copyright: (c) 2022, Daniel Schmidt <danischm@cisco.com>
+
+import threading
+import time
+from typing import Any
+from unittest import mock
+
+import pytest
+from pytest_mock import MockerFixture
+
+from nexus_pcv.cli import options
+from nexus_pcv.service import Job, ValidationService
+
+pytestmark = pytest.mark.unit
+
+CHANGES = [{"fvTenant": {"attributes": {"dn": "uni/tn-ABC", "name": "ABC"}}}]
+
+
+def wait_for(condition: Any, timeout: float = 5) -> None:
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline
+        time.sleep(0.01)
+
+
+def test_job_validation() -> None:
+    with pytest.raises(ValueError, match="'site'"):
+        Job({"name": "PCV1", "changes": CHANGES})
+    with pytest.raises(ValueError, match="'tf_plan'"):
+        Job({"name": "PCV1", "site": "LAB1"})
+    job = Job({"name": "PCV1", "site": "LAB1", "changes": CHANGES})
+    assert job.key == ("default", "LAB1")
+    assert job.suppress_events == options.suppress_events.default
+    assert job.to_dict()["status"] == "queued"
+
+
+def test_site_concurrency(mocker: MockerFixture) -> None:
+    release = threading.Event()
+
+    def ndi_pcv(self: Any, name: str, group: str, site: str, *args: Any) -> Any:
+        if site == "LAB1":
+            release.wait(5)
+        return None, [], "url"
+
+    mocker.patch("nexus_pcv.service.PCV.ndi_pcv", ndi_pcv)
+    service = ValidationService(mock.Mock(), workers=4, site_concurrency=1)
+    service.start()
+    try:
+        job1 = service.submit({"name": "PCV1", "site": "LAB1", "changes": CHANGES})
+        job2 = service.submit({"name": "PCV2", "site": "LAB1", "changes": CHANGES})
+        job3 = service.submit({"name": "PCV3", "site": "LAB2", "changes": CHANGES})
+        wait_for(lambda: job3.status == "completed")
+        assert job1.status == "running"
+        assert job2.status == "queued"
+        release.set()
+        wait_for(lambda: job2.status == "completed")
+        assert job1.status == "completed"
+        assert job2.url == "url"
+        assert service.get(job2.id) is job2
+    finally:
+        release.set()
+        service.stop()
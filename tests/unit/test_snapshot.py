@@ -0,0 +1,45 @@
+# Copyright: (c) 2022, Daniel Schmidt <danischm@cisco.com>
+
+import threading
+from pathlib import Path
+
+import pytest
+
+from nexus_pcv.apic import ApicObject
+from nexus_pcv.snapshot import SnapshotStore
+
+pytestmark = pytest.mark.unit
+
+
+def test_snapshot_store(tmp_path: Path) -> None:
+    store = SnapshotStore(str(tmp_path / "state"))
+    assert store.load("group1", "site1") is None
+    tree = ApicObject("polUni", {"dn": "uni"}, [], None)
+    tree.add_child("fvTenant", {"dn": "uni/tn-ABC", "name": "ABC"}, [])
+    store.save("group1", "site1", "epoch1", tree)
+    snapshot = store.load("group1", "site1")
+    assert snapshot is not None
+    epoch_id, data, digest = snapshot
+    assert epoch_id == "epoch1"
+    assert digest == tree.digest().hex()
+    assert data["polUni"]["children"][0]["fvTenant"]["attributes"]["name"] == "ABC"
+    assert store.load("group1", "site2") is None
+
+
+def test_snapshot_store_concurrent(tmp_path: Path) -> None:
+    store = SnapshotStore(str(tmp_path))
+    tree = ApicObject("polUni", {"dn": "uni"}, [], None)
+    for i in range(200):
+        tree.add_child("fvTenant", {"dn": f"uni/tn-{i}", "name": str(i)}, [])
+    threads = [
+        threading.Thread(target=store.save, args=("group1", "site1", "epoch1", tree))
+        for _ in range(8)
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    snapshot = store.load("group1", "site1")
+    assert snapshot is not None
+    assert snapshot[2] == tree.digest().hex()
+    assert [p.name for p in tmp_path.iterdir()] == ["group1__site1.json"]
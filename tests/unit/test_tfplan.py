@@ -0,0 +1,65 @@
+# Copyright: (c) 2022, Daniel Schmidt <danischm@cisco.com>
+
+import io
+import json
+from typing import Any
+
+import pytest
+
+from nexus_pcv.tfplan import iter_resource_changes
+
+pytestmark = pytest.mark.unit
+
+
+def change(type: str, action: str, dn: str) -> dict[str, Any]:
+    return {
+        "type": type,
+        "change": {
+            "actions": [action],
+            "after": {"dn": dn, "content": {"descr": 'a "quoted" [{text}]'}},
+        },
+    }
+
+
+@pytest.fixture
+def plan() -> dict[str, Any]:
+    return {
+        "format_version": "1.2",
+        "errored": False,
+        "prior_state": {"values": [{"value": "]}" * 10, "count": 1.5}] * 100},
+        "resource_changes": [
+            change("aci_rest_managed", "create", "uni/tn-ABC"),
+            change("null_resource", "create", "x"),
+            change("aci_rest_managed", "no-op", "uni/tn-DEF"),
+            change("aci_rest_managed", "delete", "uni/tn-[GHI]"),
+        ],
+        "configuration": {"root_module": {}},
+    }
+
+
+@pytest.mark.parametrize("chunk_size", [1, 7, 64, 1 << 20])
+@pytest.mark.parametrize("indent", [None, 2])
+def test_iter_resource_changes(
+    plan: dict[str, Any], chunk_size: int, indent: int | None
+) -> None:
+    text = json.dumps(plan, indent=indent)
+    changes = list(iter_resource_changes(io.StringIO(text), chunk_size=chunk_size))
+    assert changes == plan["resource_changes"]
+    changes = list(
+        iter_resource_changes(
+            io.StringIO(text),
+            types={"aci_rest_managed"},
+            actions={"create", "update", "delete"},
+            chunk_size=chunk_size,
+        )
+    )
+    assert [c["change"]["after"]["dn"] for c in changes] == [
+        "uni/tn-ABC",
+        "uni/tn-[GHI]",
+    ]
+
+
+def test_iter_resource_changes_truncated(plan: dict[str, Any]) -> None:
+    text = json.dumps(plan)
+    with pytest.raises(ValueError):
+        list(iter_resource_changes(io.StringIO(text[:-10]), chunk_size=16))
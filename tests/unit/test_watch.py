@@ -0,0 +1,59 @@
+# Copyright: (c) 2022, Daniel Schmidt <danischm@cisco.com>
+
+import json
+import os
+import threading
+from pathlib import Path
+
+import pytest
+
+from nexus_pcv.pcv import PCV
+from nexus_pcv.watch import FileWatcher, Watcher
+
+pytestmark = pytest.mark.unit
+
+
+def tenant(name: str) -> str:
+    return json.dumps(
+        {"fvTenant": {"attributes": {"dn": f"uni/tn-{name}", "name": name}}}
+    )
+
+
+def touch(path: Path, content: str) -> None:
+    path.write_text(content)
+    # make modification detectable independent of timestamp resolution
+    os.utime(path, ns=(path.stat().st_mtime_ns + 10**9,) * 2)
+
+
+def test_file_watcher(tmp_path: Path) -> None:
+    path = tmp_path / "tenant.json"
+    path.write_text(tenant("A"))
+    watcher = FileWatcher([str(path)], poll_interval=0.01, debounce=0.1)
+    stop = threading.Event()
+    touch(path, tenant("B"))
+    assert watcher.wait(stop) == {str(path)}
+
+    stop.set()
+    assert watcher.wait(stop) == set()
+
+
+def test_watcher(tmp_path: Path) -> None:
+    path = tmp_path / "tenant.json"
+    path.write_text(tenant("A"))
+    pcv = PCV("10.1.1.1", "admin", "password", "local", 1)
+    stop = threading.Event()
+    runs: list[tuple[str, bool]] = []
+
+    def validate(cancel: threading.Event) -> None:
+        name = str(pcv.root.children[0].children[0]["name"])
+        if name == "A":
+            # modify input while first validation is running
+            touch(path, tenant("B"))
+            cancel.wait(5)
+        else:
+            stop.set()
+        runs.append((name, cancel.is_set()))
+
+    watcher = Watcher(pcv, [str(path)], [], validate, poll_interval=0.01, debounce=0.05)
+    watcher.run(stop)
+    assert runs == [("A", True), ("B", False)]
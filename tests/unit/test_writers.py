@@ -0,0 +1,154 @@
+# Copyright: (c) 2022, Daniel Schmidt <danischm@cisco.com>
+
+import json
+import xml.etree.ElementTree as ET  # nosec B405
+from pathlib import Path
+from typing import Any
+
+import pytest
+import yaml
+
+from nexus_pcv.writers import (
+    EventWriter,
+    JsonLinesEventWriter,
+    JUnitEventWriter,
+    SarifEventWriter,
+    YamlEventWriter,
+    create_event_writer,
+)
+
+pytestmark = pytest.mark.unit
+
+EVENTS: list[dict[str, Any]] = [
+    {
+        "Category": "Connectivity",
+        "Count": 2,
+        "Description": "BD <bd1> & 'subnet' overlap",
+        "Severity": "critical",
+        "Affected Objects": ["uni/tn-ABC/BD-bd1", "uni/tn-ABC/BD-bd2"],
+    },
+    {
+        "Category": "Compliance",
+        "Count": 1,
+        "Description": "Contract missing",
+        "Severity": "minor",
+    },
+]
+
+
+def write(writer: Any) -> None:
+    with writer:
+        for event in EVENTS:
+            writer.write(event)
+
+
+def test_yaml(tmp_path: Path) -> None:
+    path = tmp_path / "summary.yaml"
+    writer = YamlEventWriter(str(path))
+    write(writer)
+    assert path.read_text() == yaml.dump(EVENTS, default_flow_style=False)
+    assert writer.getvalue() == path.read_text()
+
+
+def test_yaml_format(tmp_path: Path) -> None:
+    events = [
+        *EVENTS,
+        {"Description": "Überlappung " * 10, "Count": 1},
+        {"Description": "line 1\nline 2 " + "x" * 100, "Affected Objects": ["\t"]},
+        {"Description": "a: 'b' \"c\" " * 20 + "#", "Severity": "major"},
+    ]
+    path = tmp_path / "summary.yaml"
+    with YamlEventWriter(str(path)) as writer:
+        for event in events:
+            writer.write(event)
+    # identical to the summary written by the pure Python emitter
+    assert path.read_text() == yaml.dump(events, default_flow_style=False)
+
+
+def test_yaml_no_file() -> None:
+    writer = YamlEventWriter(None)
+    with writer:
+        writer.write(EVENTS[0])
+    assert writer.getvalue() == yaml.dump([EVENTS[0]], default_flow_style=False)
+
+
+def test_yaml_no_events(tmp_path: Path) -> None:
+    path = tmp_path / "summary.yaml"
+    with YamlEventWriter(str(path)):
+        pass
+    assert not path.exists()
+
+
+def test_json_lines(tmp_path: Path) -> None:
+    path = tmp_path / "summary.jsonl"
+    write(JsonLinesEventWriter(str(path)))
+    lines = path.read_text().splitlines()
+    assert [json.loads(line) for line in lines] == EVENTS
+
+
+def test_junit(tmp_path: Path) -> None:
+    path = tmp_path / "summary.xml"
+    write(JUnitEventWriter(str(path)))
+    root = ET.parse(path).getroot()  # nosec B314
+    cases = root.findall("./testsuite/testcase")
+    assert [c.get("name") for c in cases] == [e["Description"] for e in EVENTS]
+    failure = cases[0].find("failure")
+    assert failure is not None
+    assert failure.text == "uni/tn-ABC/BD-bd1\nuni/tn-ABC/BD-bd2"
+
+
+def test_junit_no_events(tmp_path: Path) -> None:
+    path = tmp_path / "summary.xml"
+    with JUnitEventWriter(str(path)):
+        pass
+    root = ET.parse(path).getroot()  # nosec B314
+    assert root.find("./testsuite/testcase/failure") is None
+
+
+def test_junit_failed(tmp_path: Path) -> None:
+    path = tmp_path / "summary.xml"
+    with pytest.raises(TimeoutError):
+        with JUnitEventWriter(str(path)) as writer:
+            writer.write(EVENTS[0])
+            raise TimeoutError("timed out")
+    root = ET.parse(path).getroot()  # nosec B314
+    cases = root.findall("./testsuite/testcase")
+    assert len(cases) == 2
+    error = cases[1].find("error")
+    assert error is not None
+    assert error.get("message") == "timed out"
+
+
+def test_sarif(tmp_path: Path) -> None:
+    path = tmp_path / "summary.sarif"
+    write(SarifEventWriter(str(path)))
+    sarif = json.loads(path.read_text())
+    results = sarif["runs"][0]["results"]
+    assert sarif["version"] == "2.1.0"
+    assert [r["level"] for r in results] == ["error", "warning"]
+    assert len(results[0]["locations"]) == 2
+    assert "locations" not in results[1]
+    assert sarif["runs"][0]["invocations"] == [{"executionSuccessful": True}]
+
+
+def test_sarif_failed(tmp_path: Path) -> None:
+    path = tmp_path / "summary.sarif"
+    with SarifEventWriter(str(path)) as writer:
+        writer.fail("Pre-change validation cancelled")
+    run = json.loads(path.read_text())["runs"][0]
+    assert run["results"] == []
+    assert run["invocations"][0]["executionSuccessful"] is False
+    notification = run["invocations"][0]["toolExecutionNotifications"][0]
+    assert notification["message"]["text"] == "Pre-change validation cancelled"
+
+
+def test_event_writer_abstract() -> None:
+    with pytest.raises(TypeError):
+        EventWriter("a.txt")  # type: ignore[abstract]
+
+
+def test_create_event_writer() -> None:
+    assert isinstance(create_event_writer("a.jsonl"), JsonLinesEventWriter)
+    assert isinstance(create_event_writer("a.XML"), JUnitEventWriter)
+    assert isinstance(create_event_writer("a.sarif.json"), SarifEventWriter)
+    assert isinstance(create_event_writer("a.yaml"), YamlEventWriter)